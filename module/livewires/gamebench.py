@@ -0,0 +1,459 @@
+### Benchmarks for the LiveWires games module.
+###
+### Run "python -m livewires.gamebench --help" for instructions.
+###############################################################################
+# Copyright the LiveWires contributors.  All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither name of Scripture Union nor LiveWires nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# ``AS IS'' AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SCRIPTURE UNION
+# OR THE CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+###############################################################################
+
+###############################################################################
+#
+# Each scene below fills a headless Screen with N objects of some kind,
+# and the Screen is then stepped as fast as it will go while we time
+# every frame. The numbers reported are frames per second and the
+# median (p50) and 99th percentile (p99) frame times, so that running
+# the same scenes and sizes against two revisions of the games module
+# shows whether it got faster or slower, and how it scales with N.
+#
+# For example:
+#
+#     python -m livewires.gamebench -n 100,200,400 -s bounce -s sprites
+
+import math
+import random
+from optparse import OptionParser
+from timeit import default_timer
+
+import pygame
+from pygame.locals import RLEACCEL
+from livewires import games, colour
+
+WIDTH = 640
+HEIGHT = 480
+
+COLOURS = (colour.red, colour.green, colour.blue, colour.yellow,
+           colour.white, colour.purple)
+
+
+class BenchScreen (games.Screen):
+    """
+    A headless Screen whose tick method calls whatever the current
+    scene wants called every tick.
+    """
+
+    def __init__ (self, width, height):
+        self.init_screen (width, height, headless=1)
+        self.scene_tick = None
+
+    def tick (self):
+        if self.scene_tick: self.scene_tick ()
+
+###############################################################################
+## Scenes
+###############################################################################
+##
+## Each scene is a function taking the screen and N, which creates the
+## objects for the scene.
+##
+###############################################################################
+
+class Ball (games.Circle, games.Mover):
+
+    def __init__ (self, screen):
+        self.init_circle (screen, random.randint (10, WIDTH-10),
+                          random.randint (10, HEIGHT-10),
+                          random.randint (3, 10), random.choice (COLOURS))
+        self.init_mover (random.choice ((-3, -2, -1, 1, 2, 3)),
+                         random.choice ((-3, -2, -1, 1, 2, 3)))
+
+    def moved (self):
+        (x, y) = self.pos ()
+        (dx, dy) = self.get_velocity ()
+        if x < 0 or x > WIDTH: dx = -dx
+        if y < 0 or y > HEIGHT: dy = -dy
+        self.set_velocity (dx, dy)
+
+
+def bounce_scene (screen, n):
+    "N Circle+Mover objects bouncing around the screen."
+    for i in xrange (n):
+        Ball (screen)
+
+
+def swarm_scene (screen, n):
+    """
+    The same as the bounce scene, but with the Circles moved by a
+    MoverGroup, which only calls moved when they cross the edges.
+    """
+    group = games.MoverGroup (screen, (0, 0, WIDTH, HEIGHT))
+    for i in xrange (n):
+        group.add (Ball (screen))
+
+
+class QueryingBall (Ball):
+
+    def moved (self):
+        Ball.moved (self)
+        self.touching = len (self.overlapping_objects ())
+
+
+def queries_scene (screen, n):
+    "N bouncing Circles which each look for what they're touching."
+    for i in xrange (n):
+        QueryingBall (screen)
+
+
+class CollidingBall (Ball):
+
+    def __init__ (self, screen):
+        Ball.__init__ (self, screen)
+        self.enable_collide ()
+
+    def collide (self, other):
+        self.touching = 1
+
+
+def collide_scene (screen, n):
+    "N bouncing Circles told what they're touching by collide."
+    for i in xrange (n):
+        CollidingBall (screen)
+
+
+class WorldBall (Ball):
+
+    def __init__ (self, screen):
+        Ball.__init__ (self, screen)
+        self.move_to (random.randint (10, 3*WIDTH-10),
+                      random.randint (10, 3*HEIGHT-10))
+
+    def moved (self):
+        (x, y) = self.pos ()
+        (dx, dy) = self.get_velocity ()
+        if x < 0 or x > 3*WIDTH: dx = -dx
+        if y < 0 or y > 3*HEIGHT: dy = -dy
+        self.set_velocity (dx, dy)
+
+
+def scroll_scene (screen, n):
+    """
+    N bouncing Circles in a world three times the window's width and
+    height, with the view sliding around it, so that most of them are
+    out of view.
+    """
+    for i in xrange (n):
+        WorldBall (screen)
+    def scroll (screen=screen):
+        t = screen._ticks / 50.0
+        screen.set_view (WIDTH + WIDTH * math.cos (t),
+                         HEIGHT + HEIGHT * math.sin (t))
+    screen.scene_tick = scroll
+
+
+def star_tile (size, stars, brightness):
+    "A square of black sky with some stars on it."
+    surface = pygame.Surface ((size, size)).convert ()
+    surface.fill ((0, 0, 0))
+    surface.set_colorkey ((0, 0, 0))
+    for i in xrange (stars):
+        surface.set_at ((random.randrange (size), random.randrange (size)),
+                        (brightness, brightness, brightness))
+    return surface
+
+
+def starfield_scene (screen, n):
+    """
+    The same as the bounce scene, but in front of two layers of stars
+    scrolling down the window at different speeds.
+    """
+    screen.set_background_colour (colour.black)
+    screen.add_background_layer (star_tile (128, 20, 100), 0.5)
+    screen.add_background_layer (star_tile (160, 10, 255), 1)
+    for i in xrange (n):
+        Ball (screen)
+    def scroll (screen=screen):
+        screen.scroll_background (0, -1)
+    screen.scene_tick = scroll
+
+
+def ship_image ():
+    "A small ship-shaped image, so we don't need any image files."
+    surface = pygame.Surface ((24, 16)).convert ()
+    surface.fill ((0, 0, 0))
+    surface.set_colorkey ((0, 0, 0), RLEACCEL)
+    pygame.draw.polygon (surface, colour.light_grey,
+                         ((0, 0), (23, 8), (0, 15), (6, 8)), 0)
+    return surface
+
+
+class Spinner (games.Sprite, games.Mover):
+
+    def __init__ (self, screen, image, cache=None):
+        self.init_sprite (screen, random.randint (0, WIDTH),
+                          random.randint (0, HEIGHT), image,
+                          random.randint (0, 359))
+        if cache is not None:
+            self.set_rotation_cache (cache)
+        self.init_mover (0, 0, random.choice ((-5, -3, -1, 1, 3, 5)))
+
+    def moved (self):
+        pass
+
+
+def sprites_scene (screen, n):
+    "N rotating Sprites."
+    image = ship_image ()
+    for i in xrange (n):
+        Spinner (screen, image)
+
+
+def cached_scene (screen, n):
+    "N rotating Sprites sharing a RotationCache with 5 degree steps."
+    image = ship_image ()
+    cache = games.RotationCache (5)
+    for i in xrange (n):
+        Spinner (screen, image, cache)
+
+
+def statics_scene (screen, n):
+    "N static Polygons in a grid, with a few Movers passing over them."
+    size = 12
+    cols = WIDTH / size
+    for i in xrange (n):
+        x = (i % cols) * size
+        y = ((i / cols) * size) % HEIGHT
+        games.Polygon (screen, x, y, ((0, 0), (size, 0), (size, size), (0, size)),
+                       random.choice (COLOURS), outline=colour.black, static=1)
+    for i in xrange (10):
+        Ball (screen)
+
+
+class WallBall (Ball):
+
+    def moved (self):
+        Ball.moved (self)
+        (x, y) = self.pos ()
+        self.on_wall = self.tiles.tile_at (x, y)
+
+
+def tilemap_scene (screen, n):
+    """
+    The same grid of N squares as the statics scene, as a TileMap,
+    with a few Movers passing over it and looking at the tile under
+    them every tick.
+    """
+    size = 12
+    cols = WIDTH / size
+    rows = min ((n + cols - 1) / cols, HEIGHT / size)
+    ids = [[0] * cols for i in xrange (rows)]
+    for i in xrange (n):
+        ids [(i / cols) % rows] [i % cols] = random.randint (1, len (COLOURS))
+    tiles = games.TileMap (screen, 0, 0, cols, rows, size, size,
+                           (None,) + COLOURS, ids)
+    for i in xrange (10):
+        WallBall (screen).tiles = tiles
+
+
+def particles_scene (screen, n):
+    """
+    A ParticleSystem with explosions going off all the time, keeping
+    about N particles alive. Compare with the bounce scene.
+    """
+    lifetime = 40
+    per_tick = max (1, n / (lifetime * 3 / 4))
+    particles = games.ParticleSystem (screen, capacity=n * 2, size=2,
+                                      gravity=(0, 0.05))
+    def spawn (particles=particles, per_tick=per_tick, lifetime=lifetime):
+        particles.explode (random.randint (0, WIDTH), random.randint (0, HEIGHT),
+                           per_tick, 3, lifetime, COLOURS)
+    screen.scene_tick = spawn
+
+
+def coin_frames ():
+    "Eight images of a coin flipping over."
+    frames = []
+    for i in xrange (8):
+        width = max (1, int (abs (8 * math.cos (i * math.pi / 8))))
+        surface = pygame.Surface ((16, 16)).convert ()
+        surface.fill ((0, 0, 0))
+        surface.set_colorkey ((0, 0, 0), RLEACCEL)
+        pygame.draw.ellipse (surface, colour.yellow, (8 - width, 0, 2 * width, 16))
+        frames.append (surface)
+    return frames
+
+
+def animations_scene (screen, n):
+    "N Animations, each with its own lists of images."
+    frames = coin_frames ()
+    for i in xrange (n):
+        games.Animation (screen, random.randint (0, WIDTH),
+                         random.randint (0, HEIGHT), frames [:2], frames [2:])
+
+
+def coins_scene (screen, n):
+    "N Animations sharing a FrameTable and a FrameClock."
+    frames = coin_frames ()
+    table = games.FrameTable (frames [:2], frames [2:])
+    clock = games.FrameClock (screen)
+    for i in xrange (n):
+        games.Animation (screen, random.randint (0, WIDTH),
+                         random.randint (0, HEIGHT), table, None, clock=clock)
+
+
+class Counter (games.Text, games.Timer):
+
+    def __init__ (self, screen):
+        self.init_text (screen, random.randint (20, WIDTH-20),
+                        random.randint (10, HEIGHT-10), "0", 20,
+                        random.choice (COLOURS))
+        self.init_timer (1)
+        self.count = random.randint (0, 100)
+
+    def tick (self):
+        self.count = (self.count + 1) % 100
+        self.set_text (str (self.count))
+
+
+def text_scene (screen, n):
+    "N Text objects changing their text every tick."
+    for i in xrange (n):
+        Counter (screen)
+
+
+def messages_scene (screen, n):
+    """
+    Messages spawned and expiring all the time, with about N of them
+    on the screen at once.
+    """
+    lifetime = 25
+    per_tick = max (1, n / lifetime)
+    def spawn (screen=screen, per_tick=per_tick, lifetime=lifetime):
+        for i in xrange (per_tick):
+            games.Message (screen, random.randint (20, WIDTH-20),
+                           random.randint (10, HEIGHT-10),
+                           str (random.randint (1, 100)) + "0", 24,
+                           random.choice (COLOURS), lifetime)
+    screen.scene_tick = spawn
+
+
+scenes = (('bounce', bounce_scene),
+          ('swarm', swarm_scene),
+          ('queries', queries_scene),
+          ('collide', collide_scene),
+          ('scroll', scroll_scene),
+          ('starfield', starfield_scene),
+          ('sprites', sprites_scene),
+          ('cached', cached_scene),
+          ('statics', statics_scene),
+          ('tilemap', tilemap_scene),
+          ('particles', particles_scene),
+          ('animations', animations_scene),
+          ('coins', coins_scene),
+          ('text', text_scene),
+          ('messages', messages_scene))
+
+###############################################################################
+## Running
+###############################################################################
+
+def percentile (values, fraction):
+    "Return the given fraction (0 to 1) percentile of a sorted list."
+    return values [int (round ((len (values) - 1) * fraction))]
+
+
+def run_scene (screen, scene, n, frames, warmup, seed=0):
+    """
+    Set up a scene with n objects, run it, and return a dictionary
+    of results: fps, p50 and p99 (in milliseconds).
+    """
+    random.seed (seed)
+    screen.clear ()
+    screen.set_view (0, 0)
+    screen.clear_background_layers ()
+    screen.scene_tick = None
+    scene (screen, n)
+    screen.step (warmup)
+
+    times = []
+    for i in xrange (frames):
+        start = default_timer ()
+        screen.step (1)
+        times.append (default_timer () - start)
+
+    total = sum (times)
+    times.sort ()
+    return {'fps': frames / total,
+            'p50': percentile (times, 0.5) * 1000,
+            'p99': percentile (times, 0.99) * 1000}
+
+
+def main (args=None):
+    parser = OptionParser (usage="python -m livewires.gamebench [options]")
+    parser.add_option ("-s", "--scene", action="append", dest="scenes",
+                       metavar="SCENE",
+                       help="scene to run (may be repeated): " +
+                            ", ".join ([name for name, scene in scenes]) +
+                            "; default is all of them")
+    parser.add_option ("-n", "--objects", default="100,400",
+                       help="comma-separated numbers of objects to try "
+                            "[default: %default]")
+    parser.add_option ("-f", "--frames", type="int", default=300,
+                       help="frames to time for each run [default: %default]")
+    parser.add_option ("-w", "--warmup", type="int", default=30,
+                       help="frames to run before timing [default: %default]")
+    parser.add_option ("--seed", type="int", default=0,
+                       help="random seed [default: %default]")
+    (options, args) = parser.parse_args (args)
+
+    wanted = options.scenes or [name for name, scene in scenes]
+    known = dict (scenes)
+    for name in wanted:
+        if not known.has_key (name):
+            parser.error ("unknown scene %r" % name)
+    sizes = [int (n) for n in options.objects.split (",")]
+
+    screen = BenchScreen (WIDTH, HEIGHT)
+    print "%-10s %7s %9s %9s %9s" % ("scene", "N", "fps", "p50 ms", "p99 ms")
+    for name in wanted:
+        for n in sizes:
+            try:
+                result = run_scene (screen, known [name], n, options.frames,
+                                    options.warmup, options.seed)
+            except games.GamesError, e:
+                # Some scenes need optional things, like NumPy.
+                print "%-10s %7d skipped: %s" % (name, n, e)
+                continue
+            print "%-10s %7d %9.1f %9.3f %9.3f" % (name, n, result ['fps'],
+                                                  result ['p50'], result ['p99'])
+    screen.clear ()
+
+
+if __name__ == "__main__":
+    main ()
+
+# vim:expandtab:sts=4:sw=4:showmatch:
@@ -55,7 +55,10 @@
 # by subclasses. Be warned that sometimes when you inherit from more
 # than one object class it may matter what order these are called in.
 
-import math
+import math, os, csv, bisect, weakref, threading, array
+from operator import attrgetter
+from collections import deque, OrderedDict
+from timeit import default_timer
 import pygame, pygame.transform, pygame.draw
 
 _have_image = _have_mixer = _have_font = 1
@@ -69,6 +72,18 @@ except: _have_mixer = 0
 try:    import pygame.font
 except: _have_font = 0
 
+_have_mask = 1
+try:    import pygame.mask
+except: _have_mask = 0
+
+# NumPy is optional: only ParticleSystem needs it.
+_have_numpy = 1
+try:    import numpy, pygame.surfarray
+except: _have_numpy = 0
+
+# Surface.blits, which does lots of blits in one call, is new in pygame 1.9.4.
+_have_blits = hasattr (pygame.Surface, 'blits')
+
 from pygame.locals import * # Richard's going to love this...
 
 pygame.init ()
@@ -80,6 +95,9 @@ pygame.init ()
 
 class GamesError (Exception): pass
 
+# Sort key putting objects in the order they're drawn.
+_stacking_key = attrgetter ('_key')
+
 ###############################################################################
 ## Screen class ###############################################################
 ###############################################################################
@@ -94,14 +112,31 @@ class Screen:
     initialised = 0
     got_statics = 0
 
-    def __init__ (self, width=640, height=480):
+    # Objects are filed in a grid of square cells this many pixels on a
+    # side, so that overlapping_objects need only look at nearby ones.
+    cell_size = 64
 
-        self.init_screen (width, height)
+    # The parts of the window that need updating are worked out in
+    # square tiles this many pixels on a side. If more than the given
+    # fraction of the tiles need updating, the whole window is updated.
+    dirty_tile_size = 32
+    full_update_fraction = 0.5
 
-    def init_screen (self, width=640, height=480):
+    # Size of the timing wheel that schedules Timers: wheel_levels
+    # wheels of wheel_slots slots each, which must be a power of two.
+    wheel_slots = 256
+    wheel_levels = 4
+
+    def __init__ (self, width=640, height=480, headless=0):
+
+        self.init_screen (width, height, headless)
+
+    def init_screen (self, width=640, height=480, headless=0):
         """
         width -- width of graphics window
         height -- height of graphics window
+        headless -- if true, draw into an off-screen surface instead of
+                    opening a window (handy with the step method)
         """
 
         # Bomb if you try this more than once: pygame can only have one
@@ -112,18 +147,82 @@ class Screen:
         Screen.initialised = 1
 
         # Create the pygame display
-        self._display = pygame.display.set_mode ((width, height), HWSURFACE)
+        if headless:
+            # SDL's dummy video driver gives us a display surface that
+            # doesn't need a real screen (or an X server) behind it.
+            # SDL only looks at the setting when the display starts, so
+            # put it back afterwards for anything else in the process.
+            driver = os.environ.get ('SDL_VIDEODRIVER')
+            os.environ ['SDL_VIDEODRIVER'] = 'dummy'
+            try:
+                pygame.display.quit ()
+                pygame.display.init ()
+            finally:
+                if driver is None:
+                    del os.environ ['SDL_VIDEODRIVER']
+                else:
+                    os.environ ['SDL_VIDEODRIVER'] = driver
+            self._display = pygame.display.set_mode ((width, height), 0, 32)
+        else:
+            self._display = pygame.display.set_mode ((width, height), HWSURFACE)
+        self._headless = headless
         self._width = width
         self._height = height
         self._background = self._display.convert ()
+        # The background with all the static objects drawn on it, and
+        # the rectangles of it that need rebuilding.
+        self._static_layer = self._background.copy ()
+        self._invalid = []
+        # The part of the world shown in the window; see set_view
+        self._view = pygame.Rect (0, 0, width, height)
+        # Scrolling background layers; see add_background_layer
+        self._layers = []
+        self._layers_at = []
+        self._background_scroll = (0, 0)
 
         # Initialise a list of objects in play
         self._objects = []
+        # Their stacking keys; see the comments before all_objects
+        self._keys = []
+        # Map from grid cell (column, row) to the objects touching it
+        self._grid = {}
+        # The objects that aren't static, so that frames needn't look
+        # at all the others
+        self._dynamics = {}
+        # Surfaces shared between objects; see _acquire_surface
+        self._shared = {}
+        # Objects which have asked for collide calls, and the results
+        # of the last collision pass; see the Collisions section
+        self._colliders = {}
+        self._collisions = 0
+        self._epoch = 0
+        self._contact_pairs = None
+        self._contacts = None
+        self._contacts_epoch = -1
+        # Number of ticks so far, and the timing wheel holding the
+        # Timers and callbacks due after it; see call_later
+        self._ticks = 0
+        self._wheel = [[[] for i in xrange (self.wheel_slots)]
+                       for level in xrange (self.wheel_levels)]
         # Initialise list dirty rectangles to be repainted
         self._dirtyrects = []
+        # True if frames have been run without drawing them
+        self._stale = 0
+        # Profiler recording how long frames take, if wanted
+        self._profiler = None
+
+        # Whether blit_background and blit_and_dirty are the usual ones,
+        # so that the main loop can do their work in batches
+        klass = self.__class__
+        self._plain_erase = (klass.blit_background.im_func is
+                             Screen.blit_background.im_func)
+        self._plain_draw = (klass.blit_and_dirty.im_func is
+                            Screen.blit_and_dirty.im_func)
 
         # Time when we should draw the next frame
         self._next_tick = 0
+        # Length of a tick in seconds, for things that move per second
+        self._tick_length = 1.0 / 50
 
     def is_pressed (self, key):
         """
@@ -146,8 +245,7 @@ class Screen:
             for y in range (0, self._height, background.get_height()):
                 self._background.blit(background, (x, y))
 
-        self._display.blit (self._background, (0,0))
-        pygame.display.update ()
+        self._new_background ()
 
     def set_background_colour (self, back_col):
         """
@@ -158,8 +256,152 @@ class Screen:
 
         self._background = pygame.Surface((self._width, self._height))
         self._background.fill(back_col)
-        self._display.blit(self._background, (0, 0))
-        pygame.display.update()
+        self._new_background ()
+
+    def _new_background (self):
+        """
+        Rebuild the static layer on top of a new background, and show it.
+        """
+        self._static_layer = self._background.copy ()
+        self._invalid = [self._static_layer.get_rect ()]
+        self._composite_statics ()
+        pygame.display.update ()
+
+    ## Background layers
+    ##
+    ## Background layers are images tiled across the window, in front
+    ## of the background and behind everything else, which scroll
+    ## (when scroll_background or set_view is called) each at its own
+    ## speed. Nothing window-sized is kept for them: _paint_backdrop
+    ## draws the background and the layers into just the rectangle
+    ## being rebuilt, tiling each layer from where it's scrolled to.
+    ## _layers holds (tile, x parallax, y parallax, rectangles of the
+    ## tile that aren't transparent), and _layers_at where in the plane
+    ## of tiles each layer is drawn from. When a layer moves by a whole
+    ## pixel, just the parts of the window its visible bits were in,
+    ## and are moving to, are rebuilt.
+
+    # A tile with more separate visible bits than this is treated as
+    # one bit covering them all.
+    max_layer_rects = 64
+
+    def add_background_layer (self, tile, parallax=1):
+        """
+        Add an image, tiled across the window, in front of the
+        background and any layers already added. All but the first
+        should have transparent bits, of course.
+
+        tile -- the image.
+        parallax -- how many pixels the layer moves for each pixel the
+          background is scrolled or the view moves. 1 keeps it in step
+          with the objects, less makes it look further away, and 0
+          holds it still. Can be a pair, for different speeds across
+          and down.
+        """
+        if type (parallax) not in (type (()), type ([])):
+            parallax = (parallax, parallax)
+        if tile.get_width () <= 0 or tile.get_height () <= 0:
+            raise GamesError, "A background layer can't be an empty image."
+        layer = (tile, parallax [0], parallax [1], self._visible_rects (tile))
+        self._layers.append (layer)
+        at = self._layer_position (layer)
+        self._layers_at.append (at)
+        self._invalid.extend (self._layer_rects (layer, at))
+
+    def clear_background_layers (self):
+        """
+        Remove all the background layers.
+        """
+        for layer, at in zip (self._layers, self._layers_at):
+            self._invalid.extend (self._layer_rects (layer, at))
+        self._layers = []
+        self._layers_at = []
+
+    def set_background_scroll (self, x, y=None):
+        """
+        Scroll the background layers so that the point (x, y) of a
+        layer with a parallax of 1 is at the top left of the window
+        (or would be, if the view were at (0, 0)).
+        """
+        if y is None: x, y = x
+        self._background_scroll = (x, y)
+
+    def scroll_background (self, dx, dy=None):
+        if dy is None: dx, dy = dx
+        (x, y) = self._background_scroll
+        self._background_scroll = (x + dx, y + dy)
+
+    def get_background_scroll (self):
+        return self._background_scroll
+
+    def _visible_rects (self, tile):
+        """
+        Return a list of rectangles covering the bits of |tile| that
+        aren't transparent.
+        """
+        rect = tile.get_rect ()
+        if not _have_mask or (tile.get_colorkey () is None and
+                              not tile.get_flags () & SRCALPHA):
+            return [rect]
+        rects = pygame.mask.from_surface (tile, 0).get_bounding_rects ()
+        if len (rects) > self.max_layer_rects:
+            rects = [rects [0].unionall (rects [1:])]
+        return rects
+
+    def _layer_position (self, layer):
+        """
+        Return the point of the plane tiled with |layer| that's at the
+        top left of the window.
+        """
+        (tile, px, py, rects) = layer
+        (x, y) = self._background_scroll
+        x = x + self._view.left
+        y = y + self._view.top
+        return (int (math.floor (x * px)), int (math.floor (y * py)))
+
+    def _layer_rects (self, layer, at):
+        """
+        Return the rectangles of the window covered by the visible bits
+        of |layer|, when it's drawn from the point |at| of its plane.
+        """
+        (tile, px, py, rects) = layer
+        (left, top) = at
+        (w, h) = tile.get_size ()
+        xs = range (-(left % w), self._width, w)
+        return [rect.move (x, y) for y in range (-(top % h), self._height, h)
+                for x in xs for rect in rects]
+
+    def _scroll_layers (self):
+        """
+        Note which parts of the window need rebuilding because
+        background layers have moved by a whole pixel since they were
+        last drawn.
+        """
+        full = self._static_layer.get_rect ()
+        everything = full in self._invalid
+        layers_at = self._layers_at
+        for i in xrange (len (self._layers)):
+            layer = self._layers [i]
+            at = self._layer_position (layer)
+            if at == layers_at [i]:
+                continue
+            if not everything:
+                self._invalid.extend (self._layer_rects (layer, layers_at [i]))
+                self._invalid.extend (self._layer_rects (layer, at))
+            layers_at [i] = at
+
+    def _paint_backdrop (self, surface, region):
+        """
+        Draw the background and the background layers onto |region| of
+        |surface| (which is either the static layer or the display).
+        """
+        surface.blit (self._background, region, region)
+        if self._layers:
+            surface.set_clip (region)
+            for (tile, px, py, rects), (left, top) in \
+                    zip (self._layers, self._layers_at):
+                _tile (surface, tile, left, top, region)
+            surface.set_clip (None)
 
     def tick (self):
         """
@@ -253,57 +495,486 @@ class Screen:
         for object in self._objects[:]:
             object.destroy ()
         self._objects = []
+        self._keys = []
+        self._grid = {}
+        self._dynamics = {}
+        self._colliders = {}
+        self._contact_pairs = None
 
     def _update_display (self):
         """
         Get the actual display in sync with reality.
         """
-        pygame.display.update (self._dirtyrects)
+        rects = self._coalesce_rects (self._dirtyrects)
+        if self._profiler:
+            if rects is None: self._profiler._count ('rects_presented', 1)
+            else: self._profiler._count ('rects_presented', len (rects))
+        if self._headless:
+            pass
+        elif rects is None:
+            pygame.display.update ()
+        elif rects:
+            pygame.display.update (rects)
         self._dirtyrects = []
 
-    def mainloop (self, fps = 50):
+    def _coalesce_rects (self, rects):
+        """
+        Turn a list of (probably overlapping) dirty rectangles into a
+        short list of disjoint ones covering the same tiles of the
+        window. Returns None if so much of the window is dirty that
+        it's better to update all of it.
+        """
+        if len (rects) < 2:
+            return rects
+
+        size = self.dirty_tile_size
+        width, height = self._width, self._height
+        cols = (width + size - 1) // size
+        rows = (height + size - 1) // size
+
+        # Mark every tile touched by a dirty rectangle.
+        tiles = bytearray (cols * rows)
+        ones = '\x01' * cols
+        for rect in rects:
+            left, top = max (rect.left, 0), max (rect.top, 0)
+            right, bottom = min (rect.right, width), min (rect.bottom, height)
+            if right <= left or bottom <= top:
+                continue
+            x0 = left // size
+            n = (right - 1) // size + 1 - x0
+            for y in xrange (top // size, (bottom - 1) // size + 1):
+                start = y * cols + x0
+                tiles [start:start+n] = ones [:n]
+
+        if tiles.count ('\x01') >= self.full_update_fraction * cols * rows:
+            return None
+
+        # Find the runs of marked tiles in each row, and stretch a
+        # rectangle downwards for as long as the same run recurs.
+        result = []
+        growing = {}
+        for y in xrange (rows):
+            row = tiles [y*cols:(y+1)*cols]
+            still_growing = {}
+            x = row.find ('\x01')
+            while x >= 0:
+                end = row.find ('\x00', x)
+                if end < 0: end = cols
+                try:
+                    box = growing.pop ((x, end))
+                    box [3] = y + 1
+                except KeyError:
+                    box = [x, y, end, y + 1]
+                still_growing [(x, end)] = box
+                x = row.find ('\x01', end)
+            result.extend (growing.values ())
+            growing = still_growing
+        result.extend (growing.values ())
+
+        for i in xrange (len (result)):
+            x0, y0, x1, y1 = result [i]
+            left, top = x0 * size, y0 * size
+            result [i] = pygame.Rect (left, top, min (x1 * size, width) - left,
+                                      min (y1 * size, height) - top)
+        return result
+
+    def mainloop (self, fps = 50, max_catch_up = 0):
         """
         Run the pygame main loop. This will animate the objects on the
         screen and call their tick methods every tick.
 
         fps -- target frame rate
+        max_catch_up -- if more than 0, keep the game running at the
+                        same speed on a slow computer: when drawing
+                        falls behind, up to this many extra ticks are
+                        run before each frame is drawn.
         """
 
         self._exit = 0
+        self._tick_length = 1.0 / fps
+        # Start counting from now, not from whenever the last loop ended.
+        self._next_tick = pygame.time.get_ticks ()
 
         while not self._exit:
-            self._wait_frame (fps)
+            if max_catch_up > 0:
+                self._frame (ticks = self._ticks_due (fps, max_catch_up))
+            else:
+                self._wait_frame (fps)
+                self._frame ()
+
+        # Throw away any pending events.
+        pygame.event.get()
+
+    def step (self, n_frames=1, render=1):
+        """
+        Run the given number of frames as fast as possible, instead of
+        at a steady rate like mainloop does. This is mostly useful with
+        a headless Screen, for testing games or running simulations.
+        Returns the number of frames run, which will be fewer than
+        asked for if the quit method gets called.
+
+        n_frames -- number of frames to run
+        render -- if false, objects tick and move but nothing is drawn
+        """
+
+        self._exit = 0
+        frames = 0
+        while frames < n_frames and not self._exit:
+            self._frame (render)
+            frames = frames + 1
+        return frames
+
+    def run_until (self, predicate, max_frames=None, render=1):
+        """
+        Run frames as fast as possible until calling |predicate| (with
+        no arguments) returns true, the quit method gets called or
+        |max_frames| frames have been run. Returns the number of frames
+        run.
+        """
+
+        self._exit = 0
+        frames = 0
+        while not self._exit and not predicate ():
+            if max_frames is not None and frames >= max_frames:
+                break
+            self._frame (render)
+            frames = frames + 1
+        return frames
+
+    def _frame (self, render=1, ticks=1):
+        """
+        Do everything that happens in one frame: erase the moving
+        objects, tick everything (|ticks| times over), redraw and
+        handle events.
+        """
 
-            for object in self._objects:
-                if not object._static:
+        profiler = self._profiler
+        if profiler: profiler._begin_frame ()
+
+        if render:
+            # If the last frame wasn't drawn, the display gets redrawn
+            # completely below, so there's no point erasing anything.
+            # Objects out of view weren't drawn, so needn't be erased.
+            erase = not self._stale
+            batch = []
+            layer = self._static_layer
+            view = self._view
+            for object in self._dynamics.keys ():
+                if not erase or not view.colliderect (object._rect):
+                    pass
+                elif self._batchable (object) [0]:
+                    rect = self._screen_rect (object._rect)
+                    batch.append ((layer, rect, rect))
+                else:
                     object._erase ()
-                    object._dirty = 1
+                object._dirty = 1
+            self._blits (batch)
+            if profiler: profiler._end_phase ('erase')
+
+        for i in xrange (ticks):
+            self._tick_objects ()
+
+        if render:
+            self._draw_frame ()
+        else:
+            self._stale = 1
+            self._dirtyrects = []
 
-            # Take a copy of the _objects list as it may get changed in place.
-            for object in self._objects [:]:
-                if object._tickable: object._tick ()
+        self.handle_events()
+        if profiler:
+            profiler._end_phase ('events')
+            profiler._end_frame ()
 
-            self.tick ()
+    def _tick_objects (self):
+        """
+        Advance the game by one tick.
+        """
 
-            if Screen.got_statics:
-                for object in self._objects:
-                    if not object._static:
-                        for o in object.overlapping_objects ():
-                            if o._static and not o._dirty:
-                                o._erase ()
-                                o._dirty = 1
+        now = self._ticks = self._ticks + 1
+        timers = []
+        callbacks = []
+        for due, generation, thing in self._due_entries (now):
+            if due > now:
+                self._schedule (due, generation, thing)
+            elif generation is None:
+                callbacks.append (thing)
+            elif thing._timer_generation == generation:
+                timers.append ((thing._key, generation, thing))
+
+        # Tick things in stacking order, as we always have done. Each
+        # one may stop or restart itself or any of the others.
+        timers.sort ()
+        ticked = 0
+        for key, generation, object in timers:
+            if object._timer_generation == generation:
+                object._tick ()
+                ticked = ticked + 1
+                if object._timer_generation == generation:
+                    self._schedule (now + _whole_ticks (object._period ()),
+                                    generation, object)
+        for callback in callbacks:
+            callback ()
+
+        profiler = self._profiler
+        if profiler:
+            profiler._count ('ticked', ticked)
+            profiler._end_phase ('tick')
+
+        if self._colliders or self._collisions:
+            self._collision_pass ()
+        if profiler: profiler._end_phase ('collide')
+
+        self.tick ()
+        if profiler: profiler._end_phase ('screen_tick')
+
+    def _draw_frame (self):
+        """
+        Bring the static layer up to date, draw everything that needs
+        drawing on top of it and update the display.
+        """
 
-            for object in self._objects:
-                if object._dirty:
+        if self._layers:
+            self._scroll_layers ()
+        # A stale display is copied from the static layer all at once,
+        # so the rebuilt parts needn't be copied first.
+        stale = self._stale
+        self._composite_statics (not stale)
+        if stale:
+            self._stale = 0
+            self._dirtyrects.append (self._display.blit (self._static_layer, (0, 0)))
+
+        # Static objects live in the static layer, underneath
+        # everything else. Where any are really above a moving object,
+        # that part of the window is rebuilt from the background, with
+        # the statics there drawn again in their proper places among
+        # the moving objects. (Just drawing the ones above again, on top
+        # of the static layer, would draw see-through ones twice.) The
+        # parts are worked out in tiles, as for dirty rectangles, so
+        # that they don't overlap. Objects out of view aren't drawn.
+        view = self._view
+        visible = [object for object in self._dynamics
+                   if view.colliderect (object._rect)]
+        covered = {}
+        if Screen.got_statics:
+            rects = []
+            for object in visible:
+                for o in self.overlapping_objects (object._rect):
+                    if o._static and o._key > object._key:
+                        rects.append (self._screen_rect (object._rect))
+                        break
+            if rects:
+                regions = self._coalesce_rects (rects)
+                if regions is None:
+                    regions = [self._display.get_rect ()]
+                for region in regions:
+                    self._paint_backdrop (self._display, region)
+                    self._dirtyrects.append (region)
+                    for o in self.overlapping_objects (region.move (view.topleft)):
+                        if o._static:
+                            covered.setdefault (o, []).append (region)
+
+        profiler = self._profiler
+        if profiler: profiler._end_phase ('statics')
+
+        # Objects that draw themselves in the usual way are saved up
+        # and drawn in one go, whenever anything else needs drawing.
+        drawing = visible + covered.keys ()
+        drawing.sort (key=_stacking_key)
+        batch = []
+        for object in drawing:
+            if object._dirty:
+                if self._batchable (object) [1]:
+                    batch.append ((object._surface,
+                                   self._screen_rect (object._rect)))
+                else:
+                    self._blits (batch)
                     object._draw ()
-                    object._dirty = 0
+                object._dirty = 0
+            elif covered.has_key (object):
+                self._blits (batch)
+                for region in covered [object]:
+                    self._display.set_clip (region)
+                    object._draw ()
+                self._display.set_clip (None)
+        self._blits (batch)
+
+        if profiler: profiler._end_phase ('draw')
+        self._update_display()
+        if profiler: profiler._end_phase ('update')
+
+    ## The view
+    ##
+    ## Objects' positions are in world coordinates, and the window shows
+    ## the part of the world in _view, which is the same size as the
+    ## window and starts off at (0, 0). Objects are moved to where they
+    ## belong in the window as they're drawn, so scrolling means moving
+    ## the view instead of every object (though the whole window has to
+    ## be redrawn when it moves). Objects out of view aren't erased or
+    ## drawn. The background stays where it is.
+
+    def set_view (self, x, y=None):
+        """
+        Scroll so that the top left corner of the window shows the
+        point (x, y) of the world.
+        """
+        if y is None: x, y = x
+        x, y = int (x), int (y)
+        view = self._view
+        if (x, y) == (view.left, view.top):
+            return
+        view.topleft = (x, y)
+        # Redraw everything, as if the last frame hadn't been drawn.
+        self._invalid = [self._static_layer.get_rect ()]
+        self._stale = 1
+
+    def move_view (self, dx, dy=None):
+        if dy is None: dx, dy = dx
+        self.set_view (self._view.left + dx, self._view.top + dy)
+
+    def get_view (self):
+        """
+        Return the point of the world shown at the top left corner of
+        the window.
+        """
+        return self._view.topleft
 
-            self._update_display()
+    def get_view_rect (self):
+        """
+        Return the rectangle of the world shown in the window.
+        """
+        return pygame.Rect (self._view)
 
-            self.handle_events()
+    def world_to_screen (self, pos):
+        """
+        Return where in the window a point of the world is shown.
+        """
+        return (pos [0] - self._view.left, pos [1] - self._view.top)
 
-        # Throw away any pending events.
-        pygame.event.get()
+    def screen_to_world (self, pos):
+        """
+        Return the point of the world shown at a point of the window,
+        such as the mouse position.
+        """
+        return (pos [0] + self._view.left, pos [1] + self._view.top)
+
+    def _screen_rect (self, rect):
+        """
+        Return where a rectangle of the world is in the window.
+        """
+        view = self._view
+        if view.left or view.top:
+            return rect.move (-view.left, -view.top)
+        return rect
+
+    ## Collisions
+    ##
+    ## After all the ticking, if any object has called enable_collide
+    ## (or enable_collisions has been called), we find every pair of
+    ## objects that overlap, and call collide on each object of each
+    ## pair that asked for it. The pairs are found by sorting the bounding
+    ## boxes by their left edges and only comparing boxes that start
+    ## before the other one ends ("sweep and prune"), which is done in
+    ## NumPy if we've got it.
+    ##
+    ## The results are kept, and Object.overlapping_objects uses them
+    ## for as long as they're right: _epoch goes up whenever an object
+    ## is moved, turned, changed, added, removed or restacked, and the
+    ## results are only used while it's still _contacts_epoch.
+
+    def enable_collisions (self, enabled=1):
+        """
+        Find all the overlapping objects after every tick, even if no
+        object has called enable_collide, so that calls to their
+        overlapping_objects methods after that are answered quickly.
+        """
+        self._collisions = enabled
+
+    def get_contacts (self):
+        """
+        Return a list of pairs of overlapping objects, as found after
+        the last tick, or None if anything has changed since then.
+        """
+        if self._contact_pairs is None or self._contacts_epoch != self._epoch:
+            return None
+        return self._contact_pairs [:]
+
+    def forget_contacts (self):
+        """
+        Throw away the pairs found after the last tick, so that
+        overlapping_objects works its answers out afresh. Call this if
+        something a filter_overlaps method looks at has changed, other
+        than where objects are and what they look like.
+        """
+        self._epoch = self._epoch + 1
+
+    def _cached_contacts (self, object):
+        """
+        Return the list of objects overlapping |object| found by the
+        last collision pass, or None if it's out of date.
+        """
+        if self._contact_pairs is None or self._contacts_epoch != self._epoch:
+            return None
+        contacts = self._contacts
+        if contacts is None:
+            # Only worked out when someone wants it.
+            contacts = self._contacts = {}
+            for a, b in self._contact_pairs:
+                contacts.setdefault (a, []).append (b)
+                contacts.setdefault (b, []).append (a)
+            for others in contacts.values ():
+                others.sort (key=_stacking_key)
+        return contacts.get (object, [])
+
+    def _collision_pass (self):
+        objects = [o for o in self._objects if o._collides]
+        if _have_numpy:
+            pairs = _sweep_and_prune_numpy (objects)
+        else:
+            pairs = _sweep_and_prune (objects)
+
+        touching = []
+        for a, b in pairs:
+            if a.filter_overlaps (b) and b.filter_overlaps (a):
+                if b._key < a._key: touching.append ((b._key, a._key, b, a))
+                else: touching.append ((a._key, b._key, a, b))
+        touching.sort ()
+        touching = [(a, b) for (key_a, key_b, a, b) in touching]
+        self._contact_pairs = touching
+        self._contacts = None
+        self._contacts_epoch = self._epoch
+
+        colliders = self._colliders
+        for a, b in touching:
+            if a._gone or b._gone:
+                continue
+            if a in colliders:
+                a.collide (b)
+            if b in colliders and not (a._gone or b._gone):
+                b.collide (a)
+
+    def enable_profiling (self, history=300):
+        """
+        Start recording how long each part of each frame takes, for
+        the most recent |history| frames. Returns the Profiler object
+        that keeps the records; see the Profiler class for what you
+        can do with it.
+        """
+        if self._profiler is None:
+            self._profiler = Profiler (history)
+        return self._profiler
+
+    def disable_profiling (self):
+        """
+        Stop recording frame times.
+        """
+        self._profiler = None
+
+    def get_profiler (self):
+        """
+        Return the Profiler recording frame times, or None if
+        profiling isn't enabled.
+        """
+        return self._profiler
 
     def _wait_frame (self, fps):
         "Wait for the correct fps time to expire"
@@ -312,6 +983,98 @@ class Screen:
             pygame.time.delay(int(self._next_tick+0.5) - this_tick)
         self._next_tick = this_tick + (1000./fps)
 
+    def _ticks_due (self, fps, max_catch_up):
+        """
+        Wait until the next tick is due, and return how many ticks are
+        due by then, which is more than one if we've fallen behind. If
+        we're more than |max_catch_up| ticks behind, give up on the
+        rest, so the game slows down rather than spending all its time
+        catching up.
+        """
+        length = 1000. / fps
+        this_tick = pygame.time.get_ticks()
+        if this_tick < self._next_tick:
+            pygame.time.delay(int(self._next_tick+0.5) - this_tick)
+            this_tick = self._next_tick
+        due = 1 + int((this_tick - self._next_tick) / length)
+        if due > 1 + max_catch_up:
+            due = 1 + max_catch_up
+            self._next_tick = this_tick + length
+        else:
+            self._next_tick = self._next_tick + due * length
+        return due
+
+    ## Timers
+    ##
+    ## Running Timers and the callbacks given to call_later are kept in
+    ## a hierarchical timing wheel, so that each tick only looks at the
+    ## ones that are due then. Level 0 of the wheel has a slot for each
+    ## of the next wheel_slots ticks; each slot of level 1 covers
+    ## wheel_slots ticks, and so on. Whenever level 0 comes round to
+    ## its first slot, the next slot of level 1 is emptied into level
+    ## 0, and likewise for the higher levels.
+    ##
+    ## An entry is a tuple (due, generation, thing), where thing is a
+    ## Timer or, if generation is None, a function. Stopping a Timer
+    ## just increments its _timer_generation, so that any entry for it
+    ## already in the wheel is ignored when it comes round.
+
+    def call_later (self, frames, function):
+        """
+        Arrange for |function| to be called, with no arguments, |frames|
+        ticks from now (at least one). It's called after all the Timers
+        due at the same time have been ticked.
+        """
+        self._schedule (self._ticks + max (1, int (frames)), None, function)
+
+    def _start_timer (self, timer, frames):
+        """
+        Cancel any tick a Timer is waiting for, and schedule the next
+        one |frames| ticks from now.
+        """
+        timer._timer_generation = timer._timer_generation + 1
+        if not timer._gone:
+            self._schedule (self._ticks + _whole_ticks (frames),
+                            timer._timer_generation, timer)
+
+    def _stop_timer (self, timer):
+        """
+        Cancel any tick a Timer is waiting for.
+        """
+        timer._timer_generation = timer._timer_generation + 1
+
+    def _schedule (self, due, generation, thing):
+        """
+        Put an entry into the timing wheel.
+        """
+        slots = self.wheel_slots
+        span = due - self._ticks
+        level = 0
+        while span >= slots and level < self.wheel_levels - 1:
+            span = span / slots
+            level = level + 1
+        self._wheel [level] [(due / slots ** level) % slots].append (
+            (due, generation, thing))
+
+    def _due_entries (self, now):
+        """
+        Take the entries for tick |now| out of the timing wheel, moving
+        entries down from the higher levels if it's time to.
+        """
+        slots = self.wheel_slots
+        wheel = self._wheel
+        for level in xrange (self.wheel_levels - 1, 0, -1):
+            if now % slots ** level == 0:
+                slot = (now / slots ** level) % slots
+                entries = wheel [level] [slot]
+                wheel [level] [slot] = []
+                for entry in entries:
+                    self._schedule (*entry)
+        slot = now % slots
+        entries = wheel [0] [slot]
+        wheel [0] [slot] = []
+        return entries
+
     def overlapping_objects (self, rectangle):
         """
         Returns a list of all the objects which overlap the rectangle
@@ -319,20 +1082,96 @@ class Screen:
         """
 
         rect = pygame.Rect (rectangle)
+        if self._profiler: self._profiler._count ('overlap_queries')
+
+        x0, y0, x1, y1 = self._cell_range (rect)
+        if (rect.width < 0 or rect.height < 0 or
+            (x1-x0+1) * (y1-y0+1) > len (self._objects)):
+            # Looking at every object is cheaper than looking at this
+            # many cells (and copes with inside-out rectangles).
+            rect_list = []
+            for obj in self._objects:
+                rect_list.append (obj._rect)
+
+            indices = rect.collidelistall (rect_list)
+
+            over_objects = []
+            for index in indices:
+                over_objects.append (self._objects [index])
 
-        rect_list = []
-        for obj in self._objects:
-            rect_list.append (obj._rect)
+            return over_objects
 
-        indices = rect.collidelistall (rect_list)
+        # Gather everything filed in the cells the rectangle touches.
+        grid = self._grid
+        candidates = {}
+        for cx in xrange (x0, x1+1):
+            for cy in xrange (y0, y1+1):
+                cell = grid.get ((cx, cy))
+                if cell: candidates.update (cell)
 
         over_objects = []
-        for index in indices:
-            over_objects.append (self._objects [index])
+        for obj in candidates:
+            if rect.colliderect (obj._rect):
+                over_objects.append (obj)
 
+        # Report them in stacking order, as the full search would.
+        over_objects.sort (key=_stacking_key)
         return over_objects
 
+    def _cell_range (self, rect):
+        """
+        Return (x0, y0, x1, y1), the first and last columns and rows
+        of grid cells covered by the given rectangle.
+        """
+        size = self.cell_size
+        left, top = rect.left, rect.top
+        right = max (rect.right-1, left)
+        bottom = max (rect.bottom-1, top)
+        return (left // size, top // size, right // size, bottom // size)
+
+    def _index_object (self, object):
+        """
+        File an object under the grid cells its bounding box touches.
+        Called whenever the object's bounding box may have changed.
+        """
+        cells = self._cell_range (object._rect)
+        if cells == object._cells:
+            return
+        self._unindex_object (object)
+        x0, y0, x1, y1 = cells
+        grid = self._grid
+        for cx in xrange (x0, x1+1):
+            for cy in xrange (y0, y1+1):
+                try:
+                    grid [(cx, cy)] [object] = 1
+                except KeyError:
+                    grid [(cx, cy)] = {object: 1}
+        object._cells = cells
+
+    def _unindex_object (self, object):
+        """
+        Remove an object from the grid of cells.
+        """
+        if object._cells is None:
+            return
+        x0, y0, x1, y1 = object._cells
+        grid = self._grid
+        for cx in xrange (x0, x1+1):
+            for cy in xrange (y0, y1+1):
+                cell = grid [(cx, cy)]
+                del cell [object]
+                if not cell:
+                    del grid [(cx, cy)]
+        object._cells = None
+
     ## Object list (all represented objects)
+    ##
+    ## _objects holds every object on the Screen, bottom of the stack
+    ## first. It's kept sorted by each object's _key, which is a pair
+    ## (layer, z): all of layer 0 is drawn before any of layer 1, and so
+    ## on, and within a layer objects with a smaller z are drawn first.
+    ## _keys holds the same keys in the same order, so that we can use
+    ## bisect to find where things go without copying the list around.
 
     def all_objects (self):
         """
@@ -342,95 +1181,157 @@ class Screen:
 
     def _raise(self, it, above=None):
         """
-        Raise an object to the top of the stack, or above the specified
-        object.
+        Raise an object to the top of its layer, or just above the
+        specified object (putting it in that object's layer).
         """
-        # This makes sure we're always in a consistent state.
-        objects = self._objects[:]
-        # Remove the object from the list.
-        objects.remove(it)
-        if above == None:
-            # Put it on top (the end).
-            objects.append(it)
+        if above is not None:
+            self._find(above) # Check it's there before changing anything.
+        self._unplace(it)
+        if above is None:
+            layer = it._key[0]
+            self._place(it, bisect.bisect_left(self._keys, (layer+1,)), layer)
         else:
-            # Put the object after <above>.
-            idx = 1+objects.index(above)
-            objects[idx:idx]=[it]
-        # Install the new list.
-        self._objects = objects
+            self._place(it, self._find(above)+1, above._key[0])
         # Force a redraw
         if it._static:
             it._erase()
-            it._dirty = 1
 
-    def _lower(self, object, below=None):
+    def _lower(self, it, below=None):
         """
-        Lower an object to the bottom of the stack, or below the specified
-        object.
+        Lower an object to the bottom of its layer, or just below the
+        specified object (putting it in that object's layer).
         """
-        # This makes sure we're always in a consistent state.
-        objects = self._objects[:]
-        objects.remove(it)
-        if below == None:
-            # Put the object on the beginning (bottom) of the list.
-            self._objects = [it]+objects
+        if below is not None:
+            self._find(below) # Check it's there before changing anything.
+        self._unplace(it)
+        if below is None:
+            layer = it._key[0]
+            self._place(it, bisect.bisect_left(self._keys, (layer,)), layer)
         else:
-            # Put the object before (below) the aboject.
-            idx = objects.index(below)
-            objects[idx:idx]=[it]
-            self._objects = objects
+            self._place(it, self._find(below), below._key[0])
+        # Force a redraw
+        if it._static:
+            it._erase()
 
     def _raise_list(self, objects, above=None):
         """
         Raise all the objects in a list to the top of the stack,
         or above the specified object (which must not be in the list).
         """
-        d = {}
-        for object in objects: d[object] = 1
-
-        # Objects that aren't in the list.
-        new_objects = []
-        for object in self._objects:
-            if not d.has_key(object): new_objects.append(object)
-
-        # Put the list in the right place.
-        if above: idx = new_objects.index(above)+1
-        else:     idx = len(new_objects)
-        new_objects[idx:idx] = objects
-
-        # And install.
-        self._objects = new_objects
+        for object in objects:
+            self._raise(object, above)
+            if above is not None: above = object
 
     def _lower_list(self, objects, below=None):
         """
-        Lower all the objects in a list to the top of the stack,
+        Lower all the objects in a list to the bottom of the stack,
         or below the specified object (which must not be in the list).
         """
-        d = {}
-        for object in objects: d[object] = 1
+        if below is None:
+            for object in reversed(objects):
+                self._lower(object)
+        else:
+            for object in objects:
+                self._lower(object, below)
 
-        # Objects that aren't in the list.
-        new_objects = []
-        for object in self._objects:
-            if not d.has_key(object): new_objects.append(object)
+    def _set_layer(self, object, layer):
+        """
+        Move an object to the top of the given layer.
+        """
+        self._unplace(object)
+        self._place(object, bisect.bisect_left(self._keys, (layer+1,)), layer)
+        if object._static:
+            object._erase()
 
-        # Put the list in the right place.
-        if below: idx = new_objects.index(below)
-        else:     idx = 0
-        new_objects[idx:idx] = objects
+    def _find(self, object):
+        """
+        Return the index of an object in _objects.
+        """
+        keys, objects = self._keys, self._objects
+        key = object._key
+        i = bisect.bisect_left(keys, key)
+        while i < len(keys) and keys[i] == key:
+            if objects[i] is object: return i
+            i = i + 1
+        raise ValueError, "object is not on the Screen"
+
+    def _place(self, object, index, layer):
+        """
+        Insert an object into _objects at the given index, which must
+        be at the top of, bottom of or within the given layer.
+        """
+        keys = self._keys
+        below = above = None
+        if index > 0 and keys[index-1][0] == layer:
+            below = keys[index-1][1]
+        if index < len(keys) and keys[index][0] == layer:
+            above = keys[index][1]
+        if below is None and above is None: z = 0
+        elif below is None: z = above - 1
+        elif above is None: z = below + 1
+        else:
+            z = (below + above) / 2.0
+            if not below < z < above:
+                # We've run out of room between them.
+                self._renumber(layer)
+                self._place(object, index, layer)
+                return
+        key = (layer, z)
+        keys.insert(index, key)
+        self._objects.insert(index, object)
+        object._key = key
+        self._epoch = self._epoch + 1
+
+    def _unplace(self, object):
+        """
+        Take an object out of _objects.
+        """
+        index = self._find(object)
+        del self._keys[index]
+        del self._objects[index]
+        self._epoch = self._epoch + 1
 
-        # And install.
-        self._objects = new_objects
+    def _renumber(self, layer):
+        """
+        Spread out the z values in a layer, so that there's room to put
+        things between them again.
+        """
+        keys, objects = self._keys, self._objects
+        i = bisect.bisect_left(keys, (layer,))
+        z = 0
+        while i < len(keys) and keys[i][0] == layer:
+            keys[i] = objects[i]._key = (layer, z)
+            i = i + 1
+            z = z + 1
 
     def add_object (self, object):
-        self._objects.append (object)
+        self._place (object, bisect.bisect_left (self._keys, (1,)), 0)
+        if not object._static:
+            self._dynamics [object] = 1
 
     def remove_object (self, object):
         try:
-            self._objects.remove (object)
-        except ValueError:
+            self._unplace (object)
+        except (ValueError, AttributeError):
             # Already done it: happens in some games, not an error.
             pass
+        self._unindex_object (object)
+        if self._dynamics.has_key (object):
+            del self._dynamics [object]
+        if self._colliders.has_key (object):
+            del self._colliders [object]
+        self._stop_timer (object)
+
+    def _set_static (self, object, static):
+        """
+        Record whether an object is static or not.
+        """
+        object._static = static
+        if static:
+            if self._dynamics.has_key (object):
+                del self._dynamics [object]
+        elif not object._gone:
+            self._dynamics [object] = 1
 
     def blit_and_dirty (self, source_surf, dest_pos):
         """
@@ -454,126 +1355,820 @@ class Screen:
 
     def blit_background (self, rect):
         """
-        This method draws the background over the given rectangle, and
-        marks that rectangle as ``dirty'' (see the |blit_and_dirty|
-        method for what that means). It's used to erase an object before
-        moving it. You shouldn't need to call it yourself.
+        This method draws the background (and any static objects) over
+        the given rectangle, and marks that rectangle as ``dirty'' (see
+        the |blit_and_dirty| method for what that means). It's used to
+        erase an object before moving it. You shouldn't need to call it
+        yourself.
         """
 
-        rect = self._display.blit (self._background, rect, rect)
+        rect = self._display.blit (self._static_layer, rect, rect)
         self._dirtyrects.append (rect)
 
-###########################################################################
-
-
-###############################################################################
-## Object class ###############################################################
-###############################################################################
-##                                                                           ##
-## Object represents a graphical object on the screen. Objects can be moved, ##
-## rotated, deleted, and maybe have other things done to them.               ##
-## Every object has a "reference point". When you move the object to a       ##
-## given point, it is moved so that its reference point ends up there.       ##
-##                                                                           ##
-###############################################################################
-
-class Object:
+    # Map from class to a pair of flags saying whether its _erase and
+    # _draw methods are Object's own; see _batchable.
+    _plain_methods = {}
 
-    def __init__ (self, screen, x, y, surface, a=0, x_offset=0, y_offset=0,
-                  static=0):
+    def _batchable (self, object):
         """
-        Initialise the object:
-
-        screen -- screen object to put the object on.
-        x -- x pos of object's reference point.
-        y -- y pos of object's reference point.
-        surface -- pygame.Surface object.
-        a -- initial angle of rotation, in degrees.
-        x_offset -- dx from reference point to BB top left at a=0.
-        y_offset -- dy from reference point to BB top left at a=0.
-        static -- flag, true if object usually doesn't need redrawing
-
-        If you're using rather than writing the livewires.games
-        module, then you almost certainly want to use one of the
-        subclasses of Object rather than using Object itself.
+        Return a pair of flags saying whether erasing and drawing an
+        object can be left to _blits: that is, whether it erases and
+        draws itself in the usual way, by calling blit_background and
+        blit_and_dirty (and we haven't changed what those do).
         """
+        klass = object.__class__
+        flags = self._plain_methods.get (klass)
+        if flags is None:
+            flags = (klass._erase.im_func is Object._erase.im_func,
+                     klass._draw.im_func is Object._draw.im_func)
+            self._plain_methods [klass] = flags
+        return (flags [0] and self._plain_erase, flags [1] and self._plain_draw)
+
+    def _blits (self, batch):
+        """
+        Do a list of blits to the display, each given as a tuple of
+        arguments for Surface.blit, and mark where they went as dirty.
+        The list is emptied.
+        """
+        if not batch:
+            return
+        display = self._display
+        if _have_blits:
+            self._dirtyrects.extend (display.blits (batch))
+        else:
+            for args in batch:
+                self._dirtyrects.append (apply (display.blit, args))
+        del batch [:]
 
-        self.screen = screen
-        self._static = static
-        if static:
-            Screen.got_statics = 1
-        self.screen.add_object (self)
-        self._surface = surface
-        self._orig_surface = surface # The surface before rotation
-        self._orig_rect = surface.get_rect()
+    def _invalidate (self, rect):
+        """
+        Note that the static layer needs rebuilding in the given
+        rectangle (in world coordinates), because a static object there
+        has changed.
+        """
+        self._invalid.append (self._screen_rect (pygame.Rect (rect)))
 
-        # Offset from reference point to top left corner.
-        self._x_offset_ = self._x_offset = x_offset
-        self._y_offset_ = self._y_offset = y_offset
+    def _composite_statics (self, show=1):
+        """
+        Rebuild the invalidated parts of the static layer from the
+        background and the static objects, and copy them to the display
+        unless |show| is false.
+        """
+        if not self._invalid:
+            return
+        regions = self._coalesce_rects (self._invalid)
+        if regions is None:
+            regions = [self._static_layer.get_rect ()]
+        self._invalid = []
+
+        layer = self._static_layer
+        view = self._view
+        for region in regions:
+            self._paint_backdrop (layer, region)
+            layer.set_clip (region)
+            for object in self.overlapping_objects (region.move (view.topleft)):
+                if object._static:
+                    object._composite (layer)
+            layer.set_clip (None)
+            if show:
+                self._dirtyrects.append (self._display.blit (layer, region, region))
+
+    ## Shared surfaces
+    ##
+    ## Objects that look exactly alike, like the cells of a board, can
+    ## share one surface instead of each drawing their own. _shared maps
+    ## a key describing the surface (see Polygon and Circle) to a list
+    ## [surface, number of objects using it]. Shared surfaces mustn't
+    ## be drawn on.
+
+    def _acquire_surface (self, key, render, args):
+        """
+        Return the shared surface for |key|, calling render(*args) to
+        make it if nobody's using one already.
+        """
+        entry = self._shared.get (key)
+        if entry is None:
+            entry = self._shared [key] = [apply (render, args), 0]
+        entry [1] = entry [1] + 1
+        return entry [0]
 
-        self._rect = self._surface.get_rect ()
-        self._x = 0
-        self._y = 0
-        self.move_to (x,y)
+    def _release_surface (self, key):
+        """
+        Say that one fewer object is using the shared surface for |key|.
+        """
+        entry = self._shared.get (key)
+        if entry is not None:
+            entry [1] = entry [1] - 1
+            if entry [1] <= 0:
+                del self._shared [key]
 
-        self._a = a
-        if self._a != 0:
-            self._rotate ()
+###########################################################################
 
-        self._tickable = 0
 
-        self._gone = 0
+###############################################################################
+## Profiler class #############################################################
+###############################################################################
+##
+## A Profiler records where the time goes in each frame of the main loop.
+## Ask the Screen for one with enable_profiling.
+##
+###############################################################################
 
-        self._dirty = 1
+class Profiler:
 
-    # When an object is GCed, it should disappear.
-    def __del__(self):
-        if not self._gone: self.destroy()
+    # The parts of a frame, in the order they happen.
+    phases = ('erase', 'tick', 'collide', 'screen_tick', 'statics', 'draw',
+              'update', 'events')
+    # Things counted in each frame.
+    counters = ('ticked', 'overlap_queries', 'rects_presented')
 
-    def destroy(self):
+    def __init__ (self, history=300):
         """
-        Erase object from screen and remove it from the list of objects
-        maintained by games module.
+        history -- number of frames to remember
         """
-        self._erase ()
-        if Screen.got_statics:
-            for o in self.overlapping_objects ():
-                if o._static and not o._dirty:
-                    o._erase ()
-                    o._dirty = 1
-        self.screen.remove_object (self)
-        self._gone = 1
+        self._history = history
+        self._epoch = default_timer ()
+        self._frame = None
+        self.reset ()
 
-    def _erase (self):
+    def reset (self):
         """
-        Erase object from screen by blitting the background over where
-        it was.
+        Forget all the frames recorded so far.
         """
-        self.screen.blit_background (self._rect)
+        self._frames = deque ([], self._history)
 
-    def _draw (self):
+    def frames (self):
         """
-        Draw object on screen by blitting the image onto the screen.
+        Return a list of the recorded frames, oldest first. Each is a
+        dictionary with these keys:
+
+        start -- time the frame started, in seconds since profiling began.
+        total -- time the whole frame took, in seconds.
+        one key per phase (see Profiler.phases) -- time spent in that
+            part of the frame, in seconds.
+        one key per counter (see Profiler.counters) -- how many objects
+            were ticked, how many overlap queries were made and how many
+            rectangles were passed to the display.
         """
-        self.screen.blit_and_dirty (self._surface, self._rect)
+        result = []
+        for frame in self._frames:
+            frame = frame.copy ()
+            del frame ['spans']
+            result.append (frame)
+        return result
 
-    def replace_image(self, surface):
+    def stats (self):
         """
-        Remove the current surface defining the object and replace
-        it with a new one.
+        Summarise the recorded frames. Returns a dictionary mapping
+        'frame', each phase and each counter to a pair (mean, maximum);
+        times are in milliseconds. There's also 'frames', the number of
+        frames recorded, and 'fps', the frame rate achieved.
         """
-        self._orig_surface = surface
-        self._orig_rect    = surface.get_rect()
+        frames = self._frames
+        result = {'frames': len (frames), 'fps': 0.0}
+        if len (frames) > 1:
+            elapsed = frames [-1] ['start'] - frames [0] ['start']
+            if elapsed > 0:
+                result ['fps'] = (len (frames) - 1) / elapsed
+        for key, scale in ([('total', 1000.0)] +
+                           [(phase, 1000.0) for phase in self.phases] +
+                           [(counter, 1) for counter in self.counters]):
+            values = [frame [key] * scale for frame in frames] or [0]
+            summary = (sum (values) / float (len (values)), max (values))
+            if key == 'total': key = 'frame'
+            result [key] = summary
+        return result
 
-        if self._a != 0:
-            self._rotate ()
+    def write_csv (self, file):
+        """
+        Write the recorded frames to |file| (a filename or an open
+        file) as comma-separated values, one row per frame, with times
+        in milliseconds.
+        """
+        if isinstance (file, basestring):
+            file = open (file, 'wb')
+            close = 1
         else:
-            self._replace (surface)
+            close = 0
+        writer = csv.writer (file)
+        writer.writerow (['start', 'total'] + list (self.phases) +
+                         list (self.counters))
+        for frame in self._frames:
+            row = ['%.3f' % (frame ['start'] * 1000),
+                   '%.3f' % (frame ['total'] * 1000)]
+            for phase in self.phases:
+                row.append ('%.3f' % (frame [phase] * 1000))
+            for counter in self.counters:
+                row.append (frame [counter])
+            writer.writerow (row)
+        if close: file.close ()
+
+    def write_trace (self, file):
+        """
+        Write the recorded frames to |file| (a filename or an open
+        file) in the Chrome trace event format, which you can load into
+        chrome://tracing or similar tools to see a timeline.
+        """
+        import json
+        events = []
+        for frame in self._frames:
+            start = frame ['start'] * 1e6
+            events.append ({'name': 'frame', 'ph': 'X', 'pid': 1, 'tid': 1,
+                            'ts': start, 'dur': frame ['total'] * 1e6})
+            for phase, begin, length in frame ['spans']:
+                events.append ({'name': phase, 'ph': 'X', 'pid': 1, 'tid': 1,
+                                'ts': begin * 1e6, 'dur': length * 1e6})
+            counts = {}
+            for counter in self.counters:
+                counts [counter] = frame [counter]
+            events.append ({'name': 'counts', 'ph': 'C', 'pid': 1,
+                            'ts': start, 'args': counts})
+        if isinstance (file, basestring):
+            file = open (file, 'w')
+            close = 1
+        else:
+            close = 0
+        json.dump ({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+        if close: file.close ()
+
+    ## Called by the Screen as the frame goes along
+
+    def _begin_frame (self):
+        now = default_timer () - self._epoch
+        frame = {'start': now, 'spans': []}
+        for phase in self.phases: frame [phase] = 0.0
+        for counter in self.counters: frame [counter] = 0
+        self._frame = frame
+        self._mark = now
+
+    def _end_phase (self, phase):
+        frame = self._frame
+        if frame is None: return
+        now = default_timer () - self._epoch
+        frame [phase] = frame [phase] + (now - self._mark)
+        frame ['spans'].append ((phase, self._mark, now - self._mark))
+        self._mark = now
+
+    def _count (self, counter, n=1):
+        frame = self._frame
+        if frame is not None:
+            frame [counter] = frame [counter] + n
+
+    def _end_frame (self):
+        frame = self._frame
+        frame ['total'] = self._mark - frame ['start']
+        self._frames.append (frame)
+        self._frame = None
+
+###############################################################################
+## RotationCache class ########################################################
+###############################################################################
+##
+## Rotating a surface is slow, so objects that spin all the time can
+## share a RotationCache, which remembers the rotated surfaces it has
+## made. Give one to an object with its set_rotation_cache method.
+##
+###############################################################################
+
+class RotationCache:
+    """
+    A store of rotated images, shared by any number of objects.
+
+    Angles are rounded to the nearest multiple of |step| degrees, so
+    there are at most 360/step versions of each image, and the least
+    recently used ones are thrown away when they take up more than
+    |budget| bytes between them.
+    """
+
+    def __init__ (self, step=1, budget=4*1024*1024):
+        """
+        step -- angles are rounded to a multiple of this many degrees.
+        budget -- the most memory, in bytes, to use for cached images.
+        """
+        if step <= 0:
+            raise GamesError, "A RotationCache's step must be positive."
+        self._step = step
+        self._budget = budget
+        self.clear ()
+
+    def clear (self):
+        """
+        Forget all the cached images.
+        """
+        # (image, x offset, y offset, angle) -> the result of
+        # Object._rotated, least recently used first.
+        self._entries = OrderedDict ()
+        self._used = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_step (self):
+        return self._step
+
+    def get_size (self):
+        """
+        Return the number of bytes taken up by the cached images.
+        """
+        return self._used
+
+    def _quantise (self, angle):
+        step = self._step
+        return (int (round (angle / float (step))) * step) % 360
+
+    def _rotated (self, object, angle):
+        """
+        Return an object's image rotated to |angle| (which must have
+        been through _quantise) along with its offsets, as returned by
+        Object._rotated, making it if we haven't got it already.
+        """
+        key = (object._orig_surface, object._x_offset_, object._y_offset_,
+               angle)
+        entries = self._entries
+        rotated = entries.pop (key, None)
+        if rotated is not None:
+            self.hits = self.hits + 1
+            entries [key] = rotated
+            return rotated
+
+        self.misses = self.misses + 1
+        rotated = object._rotated (angle)
+        surface = rotated [0]
+        size = surface.get_width () * surface.get_height () * \
+               surface.get_bytesize ()
+        if size <= self._budget:
+            entries [key] = rotated
+            self._used = self._used + size
+            while self._used > self._budget:
+                key, (surface, a, x, y) = entries.popitem (last=0)
+                self._used = self._used - surface.get_width () * \
+                             surface.get_height () * surface.get_bytesize ()
+        return rotated
+
+class AssetManager:
+    """
+    A store of loaded images and sounds, so that each file is only
+    read from disk once however many times it's asked for.
+
+    Images are kept by filename and transparency, and sounds by
+    filename. The least recently used are forgotten when they take up
+    more than |budget| bytes between them; anything still using them
+    keeps them, of course. The surfaces and sounds are shared, so
+    they mustn't be drawn on or changed.
+
+    The module's load_image, load_animation, load_sound,
+    load_sprite_sheet and load_atlas functions all use the
+    AssetManager called |assets|; load_image and load_sound give out
+    copies unless they're asked for the shared ones.
+
+    The preload method loads a list of files on another thread, so a
+    game can show a loading screen while that happens, and not have
+    to wait for the disk in the middle of a level.
+    """
+
+    def __init__ (self, budget=32*1024*1024):
+        """
+        budget -- the most memory, in bytes, to use for remembered
+          images and sounds.
+        """
+        self._budget = budget
+        self._lock = threading.Lock ()
+        self._pending = []
+        self._loaded = []
+        self._total = 0
+        self._thread = None
+        # Key -> the GamesError from preloading it, and the errors
+        # progress and wait haven't raised yet; see _collect.
+        self._failed = {}
+        self._unreported = []
+        self.clear ()
+
+    def clear (self):
+        """
+        Forget everything that's been loaded. Files still being
+        preloaded will be remembered when they arrive.
+        """
+        # ('image' or 'sheet', filename, transparent) or
+        # ('sound', filename) ->
+        # (surface or sound, size in bytes), least recently used first.
+        self._entries = OrderedDict ()
+        self._used = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_size (self):
+        """
+        Return the number of bytes taken up by remembered assets.
+        """
+        return self._used
+
+    def set_budget (self, budget):
+        self._budget = budget
+        self._trim ()
+
+    def get_budget (self):
+        return self._budget
+
+    ## Loading
+
+    def image (self, file, transparent=1):
+        """
+        Return the image in |file|, as load_image would, loading it
+        if it isn't remembered already.
+        """
+        if not _is_filename (file):
+            return _decode_image (file, transparent).convert ()
+        key = ('image', _normalise_filename (file), not not transparent)
+        surface = self._lookup (key)
+        if surface is None:
+            surface = _decode_image (file, transparent).convert ()
+            self._remember (key, surface)
+        return surface
+
+    def sound (self, file):
+        """
+        Return the sound in |file|, as load_sound would, loading it
+        if it isn't remembered already.
+        """
+        if not _is_filename (file):
+            return _decode_sound (file)
+        key = ('sound', _normalise_filename (file))
+        sound = self._lookup (key)
+        if sound is None:
+            sound = _decode_sound (file)
+            self._remember (key, sound)
+        return sound
+
+    def sheet (self, file, transparent=1):
+        """
+        Return the image in |file| for cutting up into frames, as
+        load_sprite_sheet and load_atlas use it. This is the same as
+        image, except that transparent sheets aren't RLE accelerated,
+        which would make drawing their frames slow.
+        """
+        if not _is_filename (file):
+            return _decode_image (file, transparent, 0).convert ()
+        key = ('sheet', _normalise_filename (file), not not transparent)
+        surface = self._lookup (key)
+        if surface is None:
+            surface = _decode_image (file, transparent, 0).convert ()
+            self._remember (key, surface)
+        return surface
+
+    def animation (self, nonrepeating_files, repeating_files=[],
+                   transparent=1):
+        """
+        Return the images in two lists of files, as load_animation
+        would.
+        """
+        nonrepeating = [self.image (file, transparent)
+                        for file in nonrepeating_files]
+        repeating = [self.image (file, transparent)
+                     for file in repeating_files]
+        return nonrepeating, repeating
+
+    ## Preloading
+    ##
+    ## The worker thread only decodes the files: converting an image
+    ## to the display's format has to happen on the main thread, which
+    ## is done by _collect whenever the main thread asks for anything.
+    ## _pending holds the keys waiting to be loaded, and _loaded the
+    ## results waiting to be collected; _lock guards both.
+
+    def preload (self, images=[], sounds=[], sheets=[]):
+        """
+        Start loading some files on another thread.
+
+        images -- a list of image filenames, or (filename, transparent)
+          pairs; transparent defaults to true, as for load_image.
+        sounds -- a list of sound filenames.
+        sheets -- a list of sprite sheet or atlas filenames, or
+          (filename, transparent) pairs, as for images.
+
+        Use the progress method to see how it's getting on.
+        """
+        keys = []
+        for kind, files in (('image', images), ('sheet', sheets)):
+            for file in files:
+                transparent = 1
+                if type (file) is type (()):
+                    (file, transparent) = file
+                keys.append ((kind, _normalise_filename (file),
+                              not not transparent))
+        for file in sounds:
+            keys.append (('sound', _normalise_filename (file)))
+
+        self._lock.acquire ()
+        try:
+            if not self._pending and not self._loaded:
+                self._total = 0
+            for key in keys:
+                self._forget_failure (key)
+                if key not in self._entries and key not in self._pending:
+                    self._pending.append (key)
+                    self._total = self._total + 1
+            if self._pending and self._thread is None:
+                self._thread = threading.Thread (target=self._work)
+                self._thread.setDaemon (1)
+                self._thread.start ()
+        finally:
+            self._lock.release ()
+
+    def progress (self):
+        """
+        Return how much of what's been asked for with preload has
+        been loaded, from 0 to 1. Raises GamesError if a file couldn't
+        be loaded, once for each such file (unless it's been asked for
+        by then, which raises the error instead).
+        """
+        self._collect ()
+        self._report ()
+        self._lock.acquire ()
+        try:
+            if not self._total: return 1.0
+            waiting = len (self._pending) + len (self._loaded)
+            return float (self._total - waiting) / self._total
+        finally:
+            self._lock.release ()
+
+    def is_preloaded (self):
+        """
+        Return true if everything asked for with preload has been
+        loaded.
+        """
+        return self.progress () >= 1.0
+
+    def wait (self):
+        """
+        Wait until everything asked for with preload has been loaded.
+        Raises GamesError if a file couldn't be loaded, as progress
+        does.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join ()
+        self._collect ()
+        self._report ()
+
+    def _work (self):
+        while 1:
+            self._lock.acquire ()
+            try:
+                if not self._pending:
+                    self._thread = None
+                    return
+                key = self._pending [0]
+            finally:
+                self._lock.release ()
+
+            try:
+                if key [0] == 'image':
+                    result = _decode_image (key [1], key [2])
+                elif key [0] == 'sheet':
+                    result = _decode_image (key [1], key [2], 0)
+                else:
+                    result = _decode_sound (key [1])
+            except GamesError, e:
+                result = e
+
+            self._lock.acquire ()
+            try:
+                del self._pending [0]
+                self._loaded.append ((key, result))
+            finally:
+                self._lock.release ()
+
+    def _collect (self):
+        """
+        Remember everything the worker thread has finished loading.
+        Files that couldn't be loaded are remembered as failures, to
+        be raised by progress or wait, or by asking for that file;
+        asking for anything else mustn't see them.
+        """
+        if not self._loaded:
+            return
+        self._lock.acquire ()
+        try:
+            loaded = self._loaded
+            self._loaded = []
+        finally:
+            self._lock.release ()
+        for key, result in loaded:
+            if isinstance (result, GamesError):
+                self._failed [key] = result
+                self._unreported.append (result)
+                continue
+            if key [0] != 'sound':
+                result = result.convert ()
+            if key not in self._entries:
+                self._remember (key, result)
+
+    def _report (self):
+        if self._unreported:
+            error = self._unreported.pop (0)
+            for key, failure in self._failed.items ():
+                if failure is error:
+                    del self._failed [key]
+            raise error
+
+    def _forget_failure (self, key):
+        """
+        Forget that |key| failed to preload, returning the error.
+        """
+        error = self._failed.pop (key, None)
+        if error is not None:
+            self._unreported.remove (error)
+        return error
+
+    ## Remembering
+
+    def _lookup (self, key):
+        self._collect ()
+        error = self._forget_failure (key)
+        if error is not None:
+            raise error
+        entries = self._entries
+        entry = entries.pop (key, None)
+        if entry is None:
+            self.misses = self.misses + 1
+            return None
+        self.hits = self.hits + 1
+        entries [key] = entry
+        return entry [0]
+
+    def _remember (self, key, asset):
+        if asset is None:
+            return
+        if key [0] != 'sound':
+            size = asset.get_width () * asset.get_height () * \
+                   asset.get_bytesize ()
+        else:
+            size = _sound_size (asset)
+        if size > self._budget:
+            return
+        self._entries [key] = (asset, size)
+        self._used = self._used + size
+        self._trim ()
+
+    def _trim (self):
+        entries = self._entries
+        while self._used > self._budget and entries:
+            key, (asset, size) = entries.popitem (last=0)
+            self._used = self._used - size
+
+###############################################################################
+## Object class ###############################################################
+###############################################################################
+##                                                                           ##
+## Object represents a graphical object on the screen. Objects can be moved, ##
+## rotated, deleted, and maybe have other things done to them.               ##
+## Every object has a "reference point". When you move the object to a       ##
+## given point, it is moved so that its reference point ends up there.       ##
+##                                                                           ##
+###############################################################################
+
+class Object:
+
+    # The angle the object's surface is drawn at. It's different from
+    # the object's angle if a RotationCache has rounded it off.
+    _a_drawn = 0
+    _rotation_cache = None
+    # The key of the Screen's shared surface we're using, if any.
+    _surface_key = None
+    # The MoverGroup moving the object, if any.
+    _group = None
+    # Whether to test for overlaps pixel by pixel; see set_precise.
+    _precise = 0
+    # Whether overlapping_objects and collide see the object at all;
+    # the chunks of a TileMap don't want to be seen.
+    _collides = 1
+
+    def __init__ (self, screen, x, y, surface, a=0, x_offset=0, y_offset=0,
+                  static=0):
+        """
+        Initialise the object:
+
+        screen -- screen object to put the object on.
+        x -- x pos of object's reference point.
+        y -- y pos of object's reference point.
+        surface -- pygame.Surface object.
+        a -- initial angle of rotation, in degrees.
+        x_offset -- dx from reference point to BB top left at a=0.
+        y_offset -- dy from reference point to BB top left at a=0.
+        static -- flag, true if object usually doesn't need redrawing
+
+        If you're using rather than writing the livewires.games
+        module, then you almost certainly want to use one of the
+        subclasses of Object rather than using Object itself.
+        """
+
+        self.screen = screen
+        self._static = static
+        if static:
+            Screen.got_statics = 1
+        self._gone = 0
+        self._cells = None # Grid cells we're filed under; see Screen
+        self._tickable = 0
+        self._timer_generation = 0 # See the Timers section of Screen
+        self.screen.add_object (self)
+        self._surface = surface
+        self._orig_surface = surface # The surface before rotation
+        self._orig_rect = surface.get_rect()
+
+        # Offset from reference point to top left corner.
+        self._x_offset_ = self._x_offset = x_offset
+        self._y_offset_ = self._y_offset = y_offset
+
+        self._rect = self._surface.get_rect ()
+        self._x = 0
+        self._y = 0
+        self.move_to (x,y)
+
+        self._a = a
+        if self._a != 0:
+            self._rotate ()
+
+        # Static objects are drawn via the Screen's static layer.
+        self._dirty = not static
+
+    # When an object is GCed, it should disappear.
+    def __del__(self):
+        if not self._gone: self.destroy()
+
+    def destroy(self):
+        """
+        Erase object from screen and remove it from the list of objects
+        maintained by games module.
+        """
+        self._erase ()
+        self.screen.remove_object (self)
+        self._unshare_surface ()
+        if self._group is not None:
+            self._group.remove (self)
+        self._gone = 1
+
+    def _share_surface (self, key, render, *args):
+        """
+        Get a surface shared with any other objects using the same |key|,
+        calling render(*args) to make it if there isn't one. Whatever
+        shared surface the object had before is given up.
+        """
+        surface = self.screen._acquire_surface (key, render, args)
+        self._unshare_surface ()
+        self._surface_key = key
+        return surface
+
+    def _unshare_surface (self):
+        if self._surface_key is not None:
+            self.screen._release_surface (self._surface_key)
+            self._surface_key = None
+
+    def _erase (self):
+        """
+        Erase object from screen by blitting the background over where
+        it was. A static object is taken out of the Screen's static
+        layer instead, which gets rebuilt before the next redraw.
+        """
+        if self._static:
+            self.screen._invalidate (self._rect)
+        else:
+            self.screen.blit_background (self.screen._screen_rect (self._rect))
+
+    def _composite (self, layer):
+        """
+        Draw a static object onto the Screen's static layer.
+        """
+        layer.blit (self._surface, self.screen._screen_rect (self._rect))
+
+    def _draw (self):
+        """
+        Draw object on screen by blitting the image onto the screen.
+        """
+        self.screen.blit_and_dirty (self._surface,
+                                    self.screen._screen_rect (self._rect))
+
+    def replace_image(self, surface):
+        """
+        Remove the current surface defining the object and replace
+        it with a new one.
+        """
+        key = self._surface_key
+        if key is not None and self.screen._shared [key] [0] is not surface:
+            # It's not the shared surface any more, so let go of that.
+            self._unshare_surface ()
+        self._orig_surface = surface
+        self._orig_rect    = surface.get_rect()
+
+        if self._a != 0:
+            self._rotate ()
+        else:
+            self._replace (surface)
 
     def _replace (self, surface):
         (x, y) = self.pos ()
+        if self._static:
+            self._erase ()
         self._surface = surface
-        self._rect = self._surface.get_rect()
+        self._rect = self._surface.get_rect(topleft=self._rect.topleft)
         self.move_to (x, y)
 
     def pos(self):      return (self._x, self._y)
@@ -590,11 +2185,17 @@ class Object:
         if y is None: x, y = x # assumed a 2-tuple
         if self._static:
             self._erase()
-            self._dirty = 1
         self._x = x
         self._y = y
         self._rect.left = int (x + self._x_offset)
         self._rect.top  = int (y + self._y_offset)
+        self.screen._epoch = self.screen._epoch + 1
+        if not self._gone:
+            self.screen._index_object (self)
+            if self._static:
+                self.screen._invalidate (self._rect)
+        if self._group is not None:
+            self._group._moved (self)
 
     def move_by(self, x, y=None):
         if y is None: x, y = x
@@ -604,17 +2205,57 @@ class Object:
 
     def rotate_to(self, angle):
         self._a = angle % 360
-        self._rotate()
+        # Even if the image doesn't change, a filter_overlaps may look
+        # at the angle.
+        self.screen._epoch = self.screen._epoch + 1
+        cache = self._rotation_cache
+        if cache is None or cache._quantise (self._a) != self._a_drawn:
+            self._rotate()
 
     def rotate_by(self, angle):
         self.rotate_to(self._a+angle)
 
+    def set_rotation_cache(self, cache):
+        """
+        Get rotated images of this object from a RotationCache, which
+        can be shared with other objects, instead of rotating the image
+        every time the object turns. Pass None to stop using it.
+        """
+        self._rotation_cache = cache
+        if self._a != 0 or self._a_drawn != 0:
+            self._rotate()
+
     def _rotate(self):
-        self._replace (pygame.transform.rotate (self._orig_surface,
-            -self._a))
-        self._rect = self._surface.get_rect()
-        self._fix_offsets()
-        self.move_to(self._x, self._y)
+        cache = self._rotation_cache
+        if cache is None:
+            self._set_rotated (self._rotated (self._a))
+        else:
+            self._set_rotated (cache._rotated (self, cache._quantise (self._a)))
+
+    def _rotated(self, angle):
+        """
+        Rotate the object's image by |angle| degrees. Returns the new
+        surface, the angle, and the offsets from the reference point to
+        the top left corner of the new surface.
+        """
+        surface = pygame.transform.rotate (self._orig_surface, -angle)
+        x_offset, y_offset = self._rotated_offsets (angle, surface.get_rect ())
+        return (surface, angle, x_offset, y_offset)
+
+    def _set_rotated(self, rotated):
+        """
+        Show a rotated image, as returned by _rotated.
+        """
+        (surface, angle, x_offset, y_offset) = rotated
+        (x, y) = self.pos ()
+        if self._static:
+            self._erase ()
+        self._surface = surface
+        self._rect = surface.get_rect (topleft=self._rect.topleft)
+        self._a_drawn = angle
+        self._x_offset = x_offset
+        self._y_offset = y_offset
+        self.move_to (x, y)
 
     def _set_offsets(self, x,y):
         self._x_offset_ = x
@@ -622,28 +2263,43 @@ class Object:
         self._fix_offsets()
 
     def _fix_offsets(self):
-        if self._a == 0:
+        if self._a_drawn == 0:
             self._x_offset = self._x_offset_
             self._y_offset = self._y_offset_
         else:
-            a = -math.pi/180 * self._a
-            c,s = math.cos(a), math.sin(a)
-            # Reference point to centre of original rectangle:
-            dx = self._x_offset_ + (self._orig_rect.centerx-self._orig_rect.left)
-            dy = self._y_offset_ + (self._orig_rect.centery-self._orig_rect.top)
-            # Reference point to centre of new rectangle:
-            dx,dy = c*dx + s*dy, -s*dx+c*dy
-            # Reference point to top left of new rectangle:
-            self._x_offset = dx - (self._rect.centerx-self._rect.left)
-            self._y_offset = dy - (self._rect.centery-self._rect.top)
+            self._x_offset, self._y_offset = \
+                self._rotated_offsets (self._a_drawn, self._rect)
+
+    def _rotated_offsets(self, angle, rect):
+        """
+        Work out the offsets from the reference point to the top left
+        corner of |rect|, which holds the object's image rotated by
+        |angle| degrees.
+        """
+        if angle == 0:
+            return (self._x_offset_, self._y_offset_)
+        a = -math.pi/180 * angle
+        c,s = math.cos(a), math.sin(a)
+        # Reference point to centre of original rectangle:
+        dx = self._x_offset_ + (self._orig_rect.centerx-self._orig_rect.left)
+        dy = self._y_offset_ + (self._orig_rect.centery-self._orig_rect.top)
+        # Reference point to centre of new rectangle:
+        dx,dy = c*dx + s*dy, -s*dx+c*dy
+        # Reference point to top left of new rectangle:
+        return (dx - (rect.centerx-rect.left), dy - (rect.centery-rect.top))
 
     ## Intersection testing
 
     def overlapping_objects(self):
+        # Nothing's changed since the last collision pass, if there
+        # was one, so we know already.
+        contacts = self.screen._cached_contacts (self)
+        if contacts is not None:
+            return contacts [:]
+
         # Find approximate overlap list
-        objects = self.screen.overlapping_objects (self._rect)
-        if self in objects:
-            objects.remove (self)
+        objects = [o for o in self.screen.overlapping_objects (self._rect)
+                   if o._collides and o is not self]
 
         # Use specialised checkers to get a better answer. This may be slow.
         result = filter(self.filter_overlaps, objects)
@@ -664,10 +2320,53 @@ class Object:
 
         This function should return 1 if the your object really
         overlaps the other object and 0 otherwise. The standard
-        |Object| class just returns 1.
+        |Object| class just returns 1, unless you've called
+        |set_precise|.
+
+        After each tick, the answers may be remembered (see
+        Screen.enable_collisions) until an object is moved, turned,
+        changed, added, removed or restacked. If your version depends on
+        anything else, call the Screen's |forget_contacts| method
+        whenever that changes.
         """
+        if self._precise:
+            return _masks_overlap (self, object)
         return 1
 
+    def set_precise(self, precise=1):
+        """
+        Make overlap tests involving this object precise: it only
+        overlaps something else if a pixel of its image that isn't
+        transparent touches one of the other's. It's not as fast as
+        just comparing bounding boxes, but the masks describing which
+        pixels are transparent are worked out only once for each image
+        (including each rotated image in a RotationCache).
+        """
+        if precise and not _have_mask:
+            raise GamesError, "We don't have pygame.mask, so can't do precise overlap tests"
+        self._precise = precise
+        self.screen._epoch = self.screen._epoch + 1
+
+    def is_precise(self):
+        return self._precise
+
+    def enable_collide(self, enabled=1):
+        """
+        Have the Screen call this object's collide method after every
+        tick, once for each object it's found to overlap, with that
+        object as the argument. Objects that haven't asked for this
+        don't get collide called, even if they have one.
+        """
+        colliders = self.screen._colliders
+        if not enabled:
+            if colliders.has_key(self):
+                del colliders[self]
+            return
+        if not hasattr(self, 'collide'):
+            raise GamesError, "This object has no collide method"
+        if not self._gone:
+            colliders[self] = 1
+
     def overlaps(self, object):
         return (self._rect.colliderect (object._rect) and
             self.filter_overlaps (object) and object.filter_overlaps
@@ -687,13 +2386,28 @@ class Object:
         """
         self.screen._lower(self, below)
 
+    def set_layer(self, layer):
+        """
+        Move the object into the given layer, which is a whole number.
+        Objects in a higher layer are always drawn on top of objects in
+        a lower one; raise_object and lower_object only move an object
+        within its layer. Objects start off in layer 0.
+        """
+        self.screen._set_layer(self, layer)
+
+    def get_layer(self):
+        return self._key[0]
+
     def treat_as_dynamic(self):
         """
         Make the object not static.  This is intended for temporary use for
         static objects that otherwise won't get redrawn correctly, such as
         the cursor on a board.
         """
-        self._static = 0
+        if self._static:
+            self.screen._set_static (self, 0)
+            self.screen._invalidate (self._rect)
+            self._dirty = 1
 
     def treat_as_static(self):
         """
@@ -702,7 +2416,10 @@ class Object:
         as an afterthought.  In particular, it won't help if no static
         objects have been made up to this point.
         """
-        self._static = 1
+        if not self._static:
+            self.screen._set_static (self, 1)
+            self._dirty = 0
+            self.screen._invalidate (self._rect)
 
 #------------------------------------------------------------------------------
 
@@ -746,7 +2463,6 @@ class ColourMixin:
             self._colour = colour
             if self._static:
                 self._erase()
-                self._dirty = 1
             surface = self._create_surface ()
             self.replace_image(surface)
 
@@ -767,7 +2483,6 @@ class OutlineMixin:
             self._outline = colour
             if self._static:
                 self._erase()
-                self._dirty = 1
             surface = self._create_surface ()
             self.replace_image(surface)
 
@@ -803,7 +2518,6 @@ class Text(Object, ColourMixin):
         self._size = size
         self._colour = colour
         self._text = text
-        self._font = pygame.font.Font(None, self._size)
         self._a = 0
         surface = self._create_surface()
         Object.__init__(self, screen, x, y, surface, x_offset=self._x_offset,
@@ -811,7 +2525,7 @@ class Text(Object, ColourMixin):
         self.move_to(x,y)
 
     def _create_surface (self):
-        result = self._font.render(self._text, 1, self._colour)
+        result = _render_text(None, self._size, self._text, self._colour)
         r = result.get_rect()
         self._set_offsets(-0.5*(r.right-r.left), -0.5*(r.bottom-r.top))
         return result
@@ -883,6 +2597,50 @@ class Polygon (Object, ColourMixin, OutlineMixin):
     def get_shape (self):
         return self._shape
 
+    # The shape and angle _geometry last worked on, and its answer.
+    _geometry_key = None
+
+    def _geometry (self):
+        """
+        Return a list of the polygon's vertices relative to its
+        reference point, turned as it's drawn, and a list of the unit
+        normals to its edges. The list of normals is None if the
+        polygon isn't convex.
+        """
+        key = (self._shape, self._a_drawn)
+        if key != self._geometry_key:
+            self._geometry_key = key
+            self._geometry_axes = _polygon_axes (self._shape, self._a_drawn)
+        return self._geometry_axes
+
+    def filter_overlaps (self, object):
+        """
+        Test whether the polygon overlaps a Circle, another Polygon or
+        the bounding box of anything else, exactly, using the separating
+        axis theorem. The polygon is treated as filled in. That only
+        works for convex polygons; anything else is taken to overlap
+        whatever its bounding box does.
+        """
+        if self._precise:
+            return _masks_overlap (self, object)
+        points, axes = self._geometry ()
+        if axes is None:
+            return 1
+        points = _translate (points, self._x, self._y)
+        if isinstance (object, Circle):
+            return _circle_polygon (object._x, object._y, object._radius,
+                                    points, axes)
+        if isinstance (object, Polygon):
+            other, other_axes = object._geometry ()
+            if other_axes is None:
+                return 1
+            other = _translate (other, object._x, object._y)
+            return _polygons_overlap (points, axes, other, other_axes)
+        r = object._rect
+        corners = ((r.left, r.top), (r.right, r.top),
+                   (r.right, r.bottom), (r.left, r.bottom))
+        return _polygons_overlap (points, axes, corners, _rect_axes)
+
     def _create_surface (self):
 
         shape = self._shape
@@ -897,7 +2655,26 @@ class Polygon (Object, ColourMixin, OutlineMixin):
             if y < miny: miny = y
             if y > maxy: maxy = y
 
-        surface = pygame.Surface ((maxx-minx + 1, maxy-miny + 1)).convert ()
+        nshape = []
+        for (x,y) in shape:
+            nshape.append ((x - minx, y - miny))
+        nshape = tuple (nshape)
+
+        # Offset from zero of user supplied co-ordinates to top left
+        # of bounding box. These offsets are added to user-supplied coords
+        # for move_to to give the new position of the top left of the surface.
+        self._set_offsets(minx, miny)
+
+        # Polygons with the same shape and colours share a surface.
+        key = ('polygon', nshape, _colour_key (self._colour),
+               _colour_key (self._outline), not not self._filled,
+               self._thickness)
+        return self._share_surface (key, self._render_surface, nshape,
+                                    (maxx-minx + 1, maxy-miny + 1))
+
+    def _render_surface (self, nshape, size):
+
+        surface = pygame.Surface (size).convert ()
 
         # The part of the surface not occupied by the polygon should be
         # transparent. We choose a colour for it that isn't the same as the
@@ -910,16 +2687,6 @@ class Polygon (Object, ColourMixin, OutlineMixin):
         surface.fill (key_colour)
         surface.set_colorkey (key_colour, RLEACCEL)
 
-        nshape = []
-        for (x,y) in shape:
-            nshape.append ((x - minx, y - miny))
-        nshape = tuple (nshape)
-
-        # Offset from zero of user supplied co-ordinates to top left
-        # of bounding box. These offsets are added to user-supplied coords
-        # for move_to to give the new position of the top left of the surface.
-        self._set_offsets(minx, miny)
-
         if self._filled:
             pygame.draw.polygon (surface, self._colour, nshape, 0)
             if self._outline != None:
@@ -960,6 +2727,15 @@ class Circle (Object, ColourMixin, OutlineMixin):
 
     def _create_surface (self):
 
+        self._set_offsets(-self._radius, -self._radius)
+
+        # Circles with the same size and colours share a surface.
+        key = ('circle', self._radius, _colour_key (self._colour),
+               _colour_key (self._outline), not not self._filled)
+        return self._share_surface (key, self._render_surface)
+
+    def _render_surface (self):
+
         surface = pygame.Surface ((2 * self._radius + 1, 2 * self._radius +1)).convert ()
 
         key_colour = (0,0,0)
@@ -971,8 +2747,6 @@ class Circle (Object, ColourMixin, OutlineMixin):
         surface.fill (key_colour)
         surface.set_colorkey (key_colour, RLEACCEL)
 
-        self._set_offsets(-self._radius, -self._radius)
-
         if self._filled:
             pygame.draw.ellipse (surface, self._colour, surface.get_rect (), 0)
             if self._outline != None:
@@ -997,6 +2771,19 @@ class Circle (Object, ColourMixin, OutlineMixin):
         pass
 
     def filter_overlaps(self, object):
+        if self._precise:
+            return _masks_overlap (self, object)
+        if isinstance (object, Circle):
+            dx = object._x - self._x
+            dy = object._y - self._y
+            r = self._radius + object._radius
+            return dx*dx + dy*dy <= r*r
+        if isinstance (object, Polygon):
+            points, axes = object._geometry ()
+            if axes is not None:
+                return _circle_polygon (self._x, self._y, self._radius,
+                                        _translate (points, object._x, object._y),
+                                        axes)
         r = object._rect
         x0,y0, x1,y1 = r.left,r.top, r.right,r.bottom
         r = self._radius
@@ -1030,27 +2817,43 @@ class Timer:
         the Object's init function.
         """
         self._interval = interval
-        self._tickable = running
-        self._next = 0
+        if running: self.start ()
+        else: self.stop ()
 
     def _tick (self):
-        self._next = self._next + 1
-        if self._next >= self._interval:
-            self._next = 0
-            self.tick ()
+        self._last_tick = self.screen._ticks
+        self.tick ()
+
+    def _period (self):
+        """
+        Return the number of ticks between calls to _tick.
+        """
+        return self._interval
 
     def get_interval (self):
         return self._interval
 
     def set_interval (self, interval):
+        """
+        Change the number of ticks between calls to |tick|. If the
+        timer is running, the next one happens |interval| ticks after
+        the last one (or after the timer was started), or on the next
+        tick if that time has already passed.
+        """
         self._interval = interval
+        if self._tickable:
+            screen = self.screen
+            screen._start_timer (self, self._last_tick + self._period ()
+                                       - screen._ticks)
 
     def stop (self):
         self._tickable = 0
+        self.screen._stop_timer (self)
 
     def start (self):
         self._tickable = 1
-        self._next = 0
+        self._last_tick = self.screen._ticks
+        self.screen._start_timer (self, self._period ())
 
 #------------------------------------------------------------------------------
 
@@ -1065,12 +2868,21 @@ class Mover (Timer):
     if the velocity of the object happens to be (0,0).
     """
 
-    def init_mover (self, dx, dy, da=0):
+    _per_second = 0
+
+    def init_mover (self, dx, dy, da=0, per_second=0):
         """
         Call this to set up the Mover's speed after you've created it.
         Its Object init method (init_circle or whatever) must already
         have been called.
+
+        dx, dy -- velocity, in pixels per tick.
+        da -- angular speed, in degrees per tick.
+        per_second -- if true, dx, dy and da are per second instead of
+                      per tick, so the object moves at the same speed
+                      whatever frame rate is passed to mainloop.
         """
+        self._per_second = per_second
         self.set_velocity (dx, dy)
         self.set_angular_speed (da)
         self.init_timer (1)
@@ -1079,9 +2891,13 @@ class Mover (Timer):
         if dy is None: dx, dy = dx
         self._dx = dx
         self._dy = dy
+        if self._group is not None:
+            self._group._velocity_changed (self)
 
     def set_angular_speed (self, da):
         self._da = da
+        if self._group is not None:
+            self._group._velocity_changed (self)
 
     def get_angular_speed (self):
         return self._da
@@ -1089,14 +2905,269 @@ class Mover (Timer):
     def get_velocity (self):
         return (self._dx, self._dy)
 
+    def stop (self):
+        if self._group is not None:
+            self._tickable = 0
+            self._group._velocity_changed (self)
+        else:
+            Timer.stop (self)
+
+    def start (self):
+        if self._group is not None:
+            self._tickable = 1
+            self._group._velocity_changed (self)
+        else:
+            Timer.start (self)
+
+    def _period (self):
+        # Movers move every tick, whatever their interval.
+        return 1
+
     def _tick (self):
-        self.move_by (self._dx, self._dy)
-        if self._da:
-            self.rotate_by (self._da)
+        if self._per_second:
+            dt = self.screen._tick_length
+            self.move_by (self._dx * dt, self._dy * dt)
+            if self._da:
+                self.rotate_by (self._da * dt)
+        else:
+            self.move_by (self._dx, self._dy)
+            if self._da:
+                self.rotate_by (self._da)
         self.moved ()
 
 #------------------------------------------------------------------------------
 
+class MoverGroup:
+    """
+    Moves lots of Movers at once. The positions and velocities of the
+    Movers in a group are kept in NumPy arrays, so moving all of them
+    takes a few array operations and a short loop to copy the answers
+    back, instead of several method calls for each one.
+
+    The moved method of a Mover in a group is only called if you ask
+    for it when you add the Mover, or if it's just gone into or out of
+    the group's bounds (see set_bounds). So a group of bullets whose
+    moved methods destroy them when they leave the screen only has to
+    call moved for the ones that leave.
+
+    Each tick, the group moves its Movers after all the Timers due then
+    have been ticked. So the Movers end up in the same places as they
+    would on their own, but things don't happen in quite the same
+    order: every Mover in the group is moved before any of their moved
+    methods are called (in the group's own order, not
+    stacking order), and all of that happens after the other Timers,
+    rather than in between them. A moved method that looks at other
+    objects sees them where they'll be at the end of the tick, and one
+    that destroys things does so after all of them have moved.
+
+    This needs NumPy.
+    """
+
+    def __init__ (self, screen, bounds=None):
+        """
+        screen -- the screen the Movers are on.
+        bounds -- a rectangle (left, top, width, height); see set_bounds.
+        """
+        if not _have_numpy:
+            raise GamesError, "We don't have NumPy, so can't create mover groups"
+        self.screen = screen
+        self._members = []
+        self._armed = 0
+        self.set_bounds (bounds)
+        self._grow (64)
+
+    def _grow (self, capacity):
+        """
+        Make the arrays big enough for |capacity| Movers.
+        """
+        n = len (self._members)
+        old = getattr (self, '_pos', None)
+        arrays = {'_pos': (2, numpy.float64), '_vel': (2, numpy.float64),
+                  '_offsets': (2, numpy.float64), '_sizes': (2, numpy.int64),
+                  '_cells': (4, numpy.int64), '_da': (0, numpy.float64),
+                  '_per_second': (0, numpy.bool_),
+                  '_running': (0, numpy.bool_), '_notify': (0, numpy.bool_)}
+        for name, (width, type) in arrays.items ():
+            if width: array = numpy.zeros ((capacity, width), type)
+            else: array = numpy.zeros (capacity, type)
+            if old is not None:
+                array [:n] = getattr (self, name) [:n]
+            setattr (self, name, array)
+
+    def add (self, mover, notify=0):
+        """
+        Start moving a Mover as part of this group, instead of by itself.
+
+        notify -- if true, call its moved method after every tick, as
+                  usual; otherwise only when it crosses the group's bounds.
+        """
+        if mover._group is self:
+            return
+        if mover._group is not None:
+            mover._group.remove (mover)
+        if mover._gone:
+            return
+        running = mover._tickable
+        Timer.stop (mover)
+        mover._tickable = running
+
+        i = len (self._members)
+        if i == len (self._pos):
+            self._grow (2 * i)
+        self._members.append (mover)
+        mover._group = self
+        mover._group_index = i
+        self._notify [i] = notify
+        self._moved (mover)
+        self._velocity_changed (mover)
+        if not self._armed:
+            self._armed = 1
+            self.screen.call_later (1, self._advance)
+
+    def remove (self, mover):
+        """
+        Stop moving a Mover as part of this group. If it's still running,
+        it goes back to moving by itself.
+        """
+        if mover._group is not self:
+            return
+        members = self._members
+        i = mover._group_index
+        last = len (members) - 1
+        if i != last:
+            # Fill the gap with the last one.
+            other = members [last]
+            members [i] = other
+            other._group_index = i
+            for array in (self._pos, self._vel, self._offsets, self._sizes,
+                          self._cells, self._da, self._per_second,
+                          self._running, self._notify):
+                array [i] = array [last]
+        del members [last]
+        mover._group = None
+        del mover._group_index
+        if mover._tickable and not mover._gone:
+            Timer.start (mover)
+
+    def members (self):
+        """
+        Return a list of the Movers in the group.
+        """
+        return self._members [:]
+
+    def count (self):
+        return len (self._members)
+
+    def set_bounds (self, bounds):
+        """
+        Set the rectangle (left, top, width, height) that the group
+        watches: the moved method of any Mover whose reference point
+        goes into or out of it is called, even if it wasn't added with
+        |notify| set. None means there are no bounds.
+        """
+        if bounds is None: self._bounds = None
+        else: self._bounds = pygame.Rect (bounds)
+
+    def get_bounds (self):
+        if self._bounds is None: return None
+        return tuple (self._bounds)
+
+    def _moved (self, mover):
+        """
+        Called when a Mover in the group has been moved, other than by
+        the group itself.
+        """
+        i = mover._group_index
+        rect = mover._rect
+        self._pos [i] = (mover._x, mover._y)
+        self._offsets [i] = (mover._x_offset, mover._y_offset)
+        self._sizes [i] = (rect.width, rect.height)
+        self._cells [i] = mover._cells or self.screen._cell_range (rect)
+
+    def _velocity_changed (self, mover):
+        """
+        Called when a Mover in the group has had its velocity changed,
+        or been started or stopped.
+        """
+        i = mover._group_index
+        self._vel [i] = (mover._dx, mover._dy)
+        self._da [i] = mover._da
+        self._per_second [i] = not not mover._per_second
+        self._running [i] = not not mover._tickable
+
+    def _inside (self, pos):
+        bounds = self._bounds
+        x = pos [:, 0]
+        y = pos [:, 1]
+        return ((x >= bounds.left) & (x <= bounds.right) &
+                (y >= bounds.top) & (y <= bounds.bottom))
+
+    def _advance (self):
+        """
+        Move everything in the group by one tick.
+        """
+        members = self._members
+        n = len (members)
+        if not n:
+            self._armed = 0
+            return
+        screen = self.screen
+        screen.call_later (1, self._advance)
+
+        running = self._running [:n]
+        scale = numpy.where (self._per_second [:n], screen._tick_length, 1.0)
+        scale = scale * running
+        pos = self._pos [:n]
+        if self._bounds is not None:
+            was_inside = self._inside (pos)
+        pos += self._vel [:n] * scale [:, numpy.newaxis]
+
+        # Work out where the rectangles go, as move_to would, and which
+        # ones have moved into different grid cells.
+        corners = (pos + self._offsets [:n]).astype (numpy.int64)
+        sizes = self._sizes [:n]
+        size = screen.cell_size
+        cells = numpy.empty ((n, 4), numpy.int64)
+        cells [:, 0:2] = corners // size
+        cells [:, 2:4] = numpy.maximum (corners + sizes - 1, corners) // size
+        changed = (cells != self._cells [:n]).any (axis=1)
+        self._cells [:n] = cells
+
+        moving = numpy.flatnonzero (running).tolist ()
+        xs = pos [:, 0].tolist ()
+        ys = pos [:, 1].tolist ()
+        lefts = corners [:, 0].tolist ()
+        tops = corners [:, 1].tolist ()
+        for i in moving:
+            mover = members [i]
+            if mover._static:
+                mover.move_to (xs [i], ys [i])
+                continue
+            mover._x = xs [i]
+            mover._y = ys [i]
+            rect = mover._rect
+            rect.left = lefts [i]
+            rect.top = tops [i]
+        for i in numpy.flatnonzero (changed & running).tolist ():
+            screen._index_object (members [i])
+        screen._epoch = screen._epoch + 1
+
+        # Anything else is done by the Movers themselves, which may
+        # change the group as they go.
+        turning = numpy.flatnonzero (running & (self._da [:n] != 0))
+        turning = [(members [i], self._da [i] * scale [i]) for i in turning]
+        for mover, angle in turning:
+            mover.rotate_by (angle)
+
+        notify = self._notify [:n]
+        if self._bounds is not None:
+            notify = notify | (was_inside != self._inside (pos))
+        for mover in [members [i] for i in numpy.flatnonzero (notify & running)]:
+            if not mover._gone:
+                mover.moved ()
+
+#------------------------------------------------------------------------------
+
 class Message (Text, Timer):
     """
     A Text object that disappears from the screen after a while.
@@ -1137,6 +3208,121 @@ class Message (Text, Timer):
 
 #------------------------------------------------------------------------------
 
+class FrameTable:
+    """
+    The images an Animation goes through, in order. If the first list
+    of images is [a,b,c,d] and the second is [x,y,z] then the images
+    are a,b,c,d, z,y,x, z,y,x, ... : the repeating ones go round
+    backwards from the last, which is the order Animation has always
+    used.
+
+    A FrameTable never changes, so any number of Animations can share
+    one; each just remembers how far through it has got.
+    """
+
+    def __init__ (self, nonrepeating_images, repeating_images=[],
+                  transparent=1):
+        """
+        nonrepeating_images -- list of images to show just once each.
+        repeating_images -- list of images to show cyclicly
+          once nonrepeating_images have finished.
+        transparent -- if the lists are of filenames, passed on to
+          load_animation.
+        """
+        if (nonrepeating_images and _is_filename (nonrepeating_images [0])) \
+           or (repeating_images and _is_filename (repeating_images [0])):
+            nonrepeating_images, repeating_images = \
+                load_animation (nonrepeating_images, repeating_images,
+                                transparent)
+        self._once = tuple (nonrepeating_images)
+        self._repeating = tuple (repeating_images)
+
+    def get_image (self, index):
+        """
+        Return image number |index|, counting from 0, or None if
+        there isn't one.
+        """
+        once = self._once
+        if index < len (once):
+            return once [index]
+        repeating = self._repeating
+        if not repeating:
+            return None
+        return repeating [(len (once) - 1 - index) % len (repeating)]
+
+#------------------------------------------------------------------------------
+
+class FrameClock:
+    """
+    Changes the images of lots of Animations at once, every |interval|
+    ticks, so they all keep in step and only the clock needs to be
+    scheduled, rather than each Animation.
+    """
+
+    def __init__ (self, screen, interval=1):
+        self.screen = screen
+        self._interval = interval
+        self._members = []
+        self._armed = 0
+
+    def get_interval (self):
+        return self._interval
+
+    def set_interval (self, interval):
+        """
+        Change the number of ticks between changes of image. This
+        takes effect after the next one.
+        """
+        self._interval = interval
+
+    def add (self, animation):
+        """
+        Make an Animation change its images when the clock says so,
+        instead of by itself.
+        """
+        if animation._clock is self:
+            return
+        if animation._clock is not None:
+            animation._clock.remove (animation)
+        running = animation._tickable
+        Timer.stop (animation)
+        animation._tickable = running
+        animation._clock = self
+        self._members.append (animation)
+        if not self._armed:
+            self._armed = 1
+            self.screen.call_later (self._interval, self._advance)
+
+    def remove (self, animation):
+        """
+        Stop an Animation using this clock. If it's still running, it
+        goes back to changing its images by itself.
+        """
+        if animation._clock is not self:
+            return
+        self._members.remove (animation)
+        animation._clock = None
+        if animation._tickable and not animation._gone:
+            Timer.start (animation)
+
+    def members (self):
+        return self._members [:]
+
+    def _advance (self):
+        members = [animation for animation in self._members
+                   if not animation._gone]
+        self._members = members
+        if not members:
+            self._armed = 0
+            return
+        self.screen.call_later (self._interval, self._advance)
+        for animation in members:
+            if animation._tickable and animation._clock is self \
+               and not animation._gone:
+                animation.tick ()
+
+#------------------------------------------------------------------------------
+
 class Animation (Sprite, Timer):
     """
     An image that changes every N ticks.
@@ -1146,69 +3332,533 @@ class Animation (Sprite, Timer):
     The n_repeats parameter is the maximum number of images to show,
     or something <= 0 to keep showing for ever.
     You can give lists of filenames instead of lists of images,
-    if you like.
+    if you like, or slices of the list load_sprite_sheet returns.
+
+    Many Animations showing the same images can share a FrameTable
+    instead of being given the lists, and a FrameClock to change
+    their images together.
 
     The reference point, as for a Sprite, is the centre of the
     bounding box.
     """
 
+    _clock = None
+
     def __init__(self, screen, x, y,
                  nonrepeating_images, repeating_images, n_repeats=0,
-                 repeat_interval=1, a=0):
+                 repeat_interval=1, a=0, clock=None):
         self.init_animation(screen, x, y,
                             nonrepeating_images, repeating_images, n_repeats,
-                            repeat_interval, a)
+                            repeat_interval, a, clock)
 
     def init_animation(self, screen, x, y,
                        nonrepeating_images, repeating_images, n_repeats,
-                       repeat_interval, a):
+                       repeat_interval, a, clock=None):
         """
         Arguments:
 
         screen -- the screen to put the image on.
         x -- the x-coordinate of the centre of the image.
         y -- the y-coordinate of the centre of the image.
-        nonrepeating_images -- list of images to show just once each.
+        nonrepeating_images -- list of images to show just once each,
+          or a FrameTable, in which case repeating_images is ignored.
         repeating_images -- list of images to show cyclicly
           once nonrepeating_images have finished.
         n_repeats -- maximum number of images to show in total,
           or something <=0 to continue for ever.
         repeat_interval -- number of frames between image changes.
         a -- angle to rotate through, in degrees.
+        clock -- a FrameClock to change images when it says, instead
+          of every repeat_interval frames.
         """
-        if nonrepeating_images and type(nonrepeating_images[0]) is type(""):
-            nonrepeating_images, repeating_images = \
-                load_animation(nonrepeating_images, repeating_images)
-        self.nonrepeating_images = nonrepeating_images
-        self.repeating_images    = repeating_images
+        if isinstance(nonrepeating_images, FrameTable):
+            self._frames = nonrepeating_images
+        else:
+            self._frames = FrameTable(nonrepeating_images, repeating_images)
+        self._frame = -1
         self.n_repeats = n_repeats or -1
         first_image = self.next_image()
         if first_image is None:
             raise GamesError, "An animation with no images is illegal."
         Object.__init__(self, screen, x, y, self.next_image())
         self.init_timer(repeat_interval)
+        if clock is not None:
+            clock.add(self)
+
+    def get_frame_table(self):
+        return self._frames
+
+    def get_frame(self):
+        """
+        Return the number of the image being shown, counting from 0,
+        in the Animation's FrameTable.
+        """
+        return self._frame
+
+    ## The lists of images still to come, as Animations used to keep
+    ## them: the nonrepeating images not yet shown, and the repeating
+    ## images turned round once for each of them that has been. These
+    ## are for reading only; the FrameTable is what's actually used.
+
+    def _get_nonrepeating_images(self):
+        return list(self._frames._once[self._frame+1:])
+
+    def _get_repeating_images(self):
+        repeating = self._frames._repeating
+        turns = max(0, self._frame + 1 - len(self._frames._once))
+        return [repeating[(i - turns) % len(repeating)]
+                for i in xrange(len(repeating))]
+
+    nonrepeating_images = property(_get_nonrepeating_images)
+    repeating_images = property(_get_repeating_images)
 
     def next_image(self):
         if self.n_repeats==0: return None
         if self.n_repeats>0: self.n_repeats -= 1
-        if self.nonrepeating_images:
-            return self.nonrepeating_images.pop(0)
-        if not self.repeating_images: return None
-        self.repeating_images = [self.repeating_images[-1]] \
-                                + self.repeating_images[:-1]
-        return self.repeating_images[0]
+        self._frame = self._frame + 1
+        return self._frames.get_image(self._frame)
 
     def tick(self):
         new_image = self.next_image()
         if new_image is None: self.destroy()
         else: self.replace_image(new_image)
 
+    def stop(self):
+        if self._clock is not None: self._tickable = 0
+        else: Timer.stop(self)
+
+    def start(self):
+        if self._clock is not None: self._tickable = 1
+        else: Timer.start(self)
+
+#------------------------------------------------------------------------------
+
+class ParticleSystem (Object, Timer):
+    """
+    A swarm of little square particles, each of which moves in a
+    straight line (or falls, if there's gravity) until its lifetime
+    runs out. Their positions, velocities, lifetimes and colours are
+    kept in NumPy arrays, so that they're all moved at once and drawn
+    in one go, and a ParticleSystem with hundreds of particles costs
+    much less than hundreds of Circles.
+
+    The reference point is the top left corner of the smallest
+    rectangle containing all the particles, and it moves by itself:
+    don't move a ParticleSystem about yourself.
+
+    This needs NumPy.
+    """
+
+    def __init__ (self, screen, capacity=1000, size=1, gravity=(0, 0)):
+        self.init_particles (screen, capacity, size, gravity)
+
+    def init_particles (self, screen, capacity=1000, size=1, gravity=(0, 0)):
+        """
+        Arguments:
+
+        screen -- the screen the particles are on.
+        capacity -- the most particles there can be at once. Any more
+                    than that are ignored.
+        size -- the width and height of each particle, in pixels.
+        gravity -- (ddx, ddy) added to each particle's velocity every tick.
+        """
+        if not _have_numpy:
+            raise GamesError, "We don't have NumPy, so can't create particle systems"
+        self._capacity = capacity
+        self._size = size
+        self.set_gravity (gravity)
+        self._n = 0
+        self._pos = numpy.zeros ((capacity, 2))
+        self._vel = numpy.zeros ((capacity, 2))
+        self._life = numpy.zeros (capacity, numpy.int32)
+        self._colours = numpy.zeros (capacity, numpy.uint32)
+
+        # The particles in view are drawn on a screen-sized canvas, and
+        # the part of it that they cover is the object's surface.
+        canvas = pygame.Surface ((screen._width, screen._height)).convert ()
+        if canvas.get_bytesize () == 3:
+            # surfarray can't get at the pixels of 24-bit surfaces.
+            canvas = pygame.Surface (canvas.get_size (), 0, 32)
+        canvas.fill ((0, 0, 0))
+        canvas.set_colorkey ((0, 0, 0))
+        self._canvas = canvas
+        self._transparent = canvas.map_rgb ((0, 0, 0))
+        self._drawn = pygame.Rect (0, 0, 0, 0)
+
+        Object.__init__ (self, screen, 0, 0, canvas.subsurface (self._drawn))
+        self.init_timer (1)
+
+    def add_particles (self, positions, velocities, lifetimes, colours):
+        """
+        Add some particles, and return how many were added (which is
+        fewer than you asked for if the ParticleSystem is full).
+
+        positions -- a sequence of (x, y) pairs, one per particle.
+        velocities -- a sequence of (dx, dy) pairs, or one pair for all.
+        lifetimes -- a sequence of numbers of ticks, or one for all.
+        colours -- a sequence of colours, or one colour for all.
+        """
+        positions = numpy.asarray (positions, numpy.float64).reshape ((-1, 2))
+        n = min (len (positions), self._capacity - self._n)
+        if n <= 0:
+            return 0
+        i, j = self._n, self._n + n
+        self._pos [i:j] = positions [:n]
+        velocities = numpy.asarray (velocities, numpy.float64)
+        if velocities.ndim == 1: self._vel [i:j] = velocities
+        else: self._vel [i:j] = velocities [:n]
+        lifetimes = numpy.asarray (lifetimes)
+        if lifetimes.ndim == 0: self._life [i:j] = lifetimes
+        else: self._life [i:j] = lifetimes [:n]
+        if numpy.ndim (colours) == 1:
+            self._colours [i:j] = self._map_colour (colours)
+        else:
+            self._colours [i:j] = map (self._map_colour, colours [:n])
+        self._n = j
+        self._redraw ()
+        return n
+
+    def explode (self, x, y, n, speed, lifetime, colour):
+        """
+        Add |n| particles at (x, y), flying off in all directions at up
+        to |speed| pixels per tick and lasting between half |lifetime|
+        and |lifetime| ticks. |colour| can be one colour or a list of
+        colours to choose from at random.
+        """
+        angles = numpy.random.uniform (0, 2 * math.pi, n)
+        speeds = numpy.random.uniform (0, speed, n)
+        velocities = numpy.empty ((n, 2))
+        velocities [:, 0] = speeds * numpy.cos (angles)
+        velocities [:, 1] = speeds * numpy.sin (angles)
+        lifetimes = numpy.random.randint (max (1, lifetime / 2), lifetime + 1, n)
+        if numpy.ndim (colour) == 2:
+            colour = [colour [i] for i in numpy.random.randint (0, len (colour), n)]
+        return self.add_particles ([(x, y)] * n, velocities, lifetimes, colour)
+
+    def count (self):
+        """
+        Return the number of live particles.
+        """
+        return self._n
+
+    def clear_particles (self):
+        self._n = 0
+        self._redraw ()
+
+    def set_gravity (self, gravity):
+        self._gravity = numpy.array (gravity, numpy.float64)
+
+    def get_gravity (self):
+        return tuple (self._gravity)
+
+    def _map_colour (self, colour):
+        pixel = self._canvas.map_rgb (colour)
+        if pixel == self._transparent:
+            # Nearly black, because black is see-through on the canvas.
+            pixel = self._canvas.map_rgb ((8, 8, 8))
+        return pixel
+
+    def _period (self):
+        return 1
+
+    def _tick (self):
+        n = self._n
+        if n:
+            self._pos [:n] += self._vel [:n]
+            self._vel [:n] += self._gravity
+            life = self._life [:n]
+            life -= 1
+            alive = life > 0
+            k = int (numpy.count_nonzero (alive))
+            if k < n:
+                for array in (self._pos, self._vel, self._life, self._colours):
+                    array [:k] = array [:n] [alive]
+                self._n = k
+        self._redraw ()
+
+    def _redraw (self):
+        """
+        Draw the particles on the canvas, and make the part of it they
+        cover the object's surface.
+        """
+        canvas = self._canvas
+        canvas.fill ((0, 0, 0), self._drawn)
+        size = self._size
+        width, height = canvas.get_size ()
+        n = self._n
+        view = self.screen._view
+        positions = numpy.floor (self._pos [:n] - view.topleft).astype (numpy.int32)
+        x = positions [:, 0]
+        y = positions [:, 1]
+        on = (x >= 0) & (y >= 0) & (x <= width - size) & (y <= height - size)
+        if on.any ():
+            x = x [on]
+            y = y [on]
+            colours = self._colours [:n] [on]
+            pixels = pygame.surfarray.pixels2d (canvas)
+            for dx in xrange (size):
+                for dy in xrange (size):
+                    pixels [x + dx, y + dy] = colours
+            del pixels # Unlocks the canvas
+            left, top = int (x.min ()), int (y.min ())
+            self._drawn = pygame.Rect (left, top, int (x.max ()) + size - left,
+                                       int (y.max ()) + size - top)
+        else:
+            self._drawn = pygame.Rect (0, 0, 0, 0)
+        self._surface = canvas.subsurface (self._drawn)
+        self._rect = self._drawn.move (view.topleft)
+        self.move_to (self._rect.left, self._rect.top)
+
+    def _rotate (self):
+        pass
+
+#------------------------------------------------------------------------------
+
+class TileMap:
+    """
+    A rectangular grid of tiles, for the walls and floors of maze and
+    grid games, which costs much less than an Object for every tile.
+
+    Each tile is a number, its id, which picks one of the |tiles| given
+    to the constructor: an image, a colour, or None for a tile that
+    isn't drawn. The ids are kept in one compact array, and the tiles
+    are drawn onto a few big static objects ("chunks"), each covering
+    a square of |chunk_size| tiles on a side. Changing a tile redraws
+    just that tile on its chunk.
+
+    The chunks don't show up in the results of overlapping_objects or
+    get collide called on them: to see whether something has run into
+    a wall, ask the TileMap what's there with tile_at.
+    """
+
+    def __init__ (self, screen, x, y, columns, rows, tile_width, tile_height,
+                  tiles, ids=None, chunk_size=16):
+        self.init_tilemap (screen, x, y, columns, rows, tile_width,
+                           tile_height, tiles, ids, chunk_size)
+
+    def init_tilemap (self, screen, x, y, columns, rows, tile_width,
+                      tile_height, tiles, ids=None, chunk_size=16):
+        """
+        Arguments:
+
+        screen -- the screen to put the tiles on.
+        x, y -- the position of the top left corner of the map.
+        columns, rows -- the number of tiles across and down.
+        tile_width, tile_height -- the size of each tile, in pixels.
+        tiles -- a list of what each tile id looks like: an image, a
+          colour, or None. Images are drawn at the top left of the tile.
+        ids -- a list of rows, each a list of the ids of the tiles along
+          it. Defaults to all 0.
+        chunk_size -- the number of tiles across and down each chunk.
+        """
+        if columns <= 0 or rows <= 0 or tile_width <= 0 or tile_height <= 0:
+            raise GamesError, "A TileMap must have a positive size."
+        self.screen = screen
+        self._x = x
+        self._y = y
+        self._columns = columns
+        self._rows = rows
+        self._tile_width = tile_width
+        self._tile_height = tile_height
+        self._chunk_size = chunk_size
+
+        self._tiles = []
+        colours = {}
+        for tile in tiles:
+            if tile is None or isinstance (tile, pygame.Surface):
+                self._tiles.append (tile)
+            else:
+                self._tiles.append (_colour_key (tile) [:3])
+                colours [_colour_key (tile) [:3]] = 1
+        # Where no tile is drawn, the chunks are this colour, which
+        # they treat as transparent, so it mustn't be any tile's colour.
+        # There are fewer tiles than colours to try, so one will do.
+        key_colour = (255, 0, 255)
+        n = 0
+        while colours.has_key (key_colour):
+            key_colour = (n >> 16 & 255, n >> 8 & 255, n & 255)
+            n = n + 1
+        self._key_colour = key_colour
+
+        if len (tiles) <= 256: typecode = 'B'
+        else: typecode = 'H'
+        self._ids = array.array (typecode, [0]) * (columns * rows)
+
+        # Every tile starts off as tile 0, which is drawn on each chunk
+        # as it's made; after that, only tiles that change are drawn.
+        first = None
+        if self._tiles: first = self._tiles [0]
+        self._chunks = []
+        for top in xrange (0, rows, chunk_size):
+            row = []
+            for left in xrange (0, columns, chunk_size):
+                surface = pygame.Surface (
+                    (min (chunk_size, columns - left) * tile_width,
+                     min (chunk_size, rows - top) * tile_height)).convert ()
+                surface.fill (key_colour)
+                surface.set_colorkey (key_colour)
+                if isinstance (first, pygame.Surface):
+                    area = (0, 0, tile_width, tile_height)
+                    for tile_y in xrange (0, surface.get_height (), tile_height):
+                        for tile_x in xrange (0, surface.get_width (), tile_width):
+                            surface.blit (first, (tile_x, tile_y), area)
+                elif first is not None:
+                    surface.fill (first)
+                row.append (_TileChunk (screen, x + left * tile_width,
+                                        y + top * tile_height, surface))
+            self._chunks.append (row)
+
+        if ids is not None:
+            self.set_tiles (ids)
+
+    def get_size (self):
+        """
+        Return the number of tiles across and down.
+        """
+        return (self._columns, self._rows)
+
+    def get_tile_size (self):
+        return (self._tile_width, self._tile_height)
+
+    def pos (self):
+        return (self._x, self._y)
+
+    ## Tiles
+
+    def get_tile (self, column, row):
+        """
+        Return the id of a tile, or None if it's off the map.
+        """
+        if 0 <= column < self._columns and 0 <= row < self._rows:
+            return self._ids [row * self._columns + column]
+        return None
+
+    def set_tile (self, column, row, id):
+        """
+        Change the id of a tile, and redraw it.
+        """
+        self._check (column, row, id)
+        i = row * self._columns + column
+        if self._ids [i] != id:
+            self._ids [i] = id
+            self._draw_tile (column, row)
+
+    def set_tiles (self, ids, column=0, row=0):
+        """
+        Change the ids of a block of tiles, and redraw them.
+
+        ids -- a list of rows, each a list of ids along it.
+        column, row -- the tile at the top left of the block.
+        """
+        for j in xrange (len (ids)):
+            for i in xrange (len (ids [j])):
+                self._check (column + i, row + j, ids [j] [i])
+        for j in xrange (len (ids)):
+            start = (row + j) * self._columns + column
+            line = ids [j]
+            for i in xrange (len (line)):
+                if self._ids [start + i] != line [i]:
+                    self._ids [start + i] = line [i]
+                    self._draw_tile (column + i, row + j)
+
+    def tile_at (self, x, y):
+        """
+        Return the id of the tile under the point (x, y), or None if
+        it's off the map.
+        """
+        column = int ((x - self._x) // self._tile_width)
+        row = int ((y - self._y) // self._tile_height)
+        return self.get_tile (column, row)
+
+    def cell_at (self, x, y):
+        """
+        Return (column, row) of the tile under the point (x, y), or
+        None if it's off the map.
+        """
+        column = int ((x - self._x) // self._tile_width)
+        row = int ((y - self._y) // self._tile_height)
+        if 0 <= column < self._columns and 0 <= row < self._rows:
+            return (column, row)
+        return None
+
+    def tile_rect (self, column, row):
+        """
+        Return the rectangle a tile takes up on the screen.
+        """
+        return pygame.Rect (int (self._x) + column * self._tile_width,
+                            int (self._y) + row * self._tile_height,
+                            self._tile_width, self._tile_height)
+
+    ## The chunks
+
+    def set_layer (self, layer):
+        """
+        Move all the tiles into the given layer; see Object.set_layer.
+        """
+        for row in self._chunks:
+            for chunk in row:
+                chunk.set_layer (layer)
+
+    def lower_object (self):
+        """
+        Put the tiles at the bottom of their layer, underneath everything.
+        """
+        for row in self._chunks:
+            for chunk in row:
+                chunk.lower_object ()
+
+    def destroy (self):
+        for row in self._chunks:
+            for chunk in row:
+                chunk.destroy ()
+        self._chunks = []
+
+    def _check (self, column, row, id):
+        if not (0 <= column < self._columns and 0 <= row < self._rows):
+            raise GamesError, "There's no tile at (%d, %d)" % (column, row)
+        if not 0 <= id < len (self._tiles):
+            raise GamesError, "There's no tile with id %d" % id
+
+    def _draw_tile (self, column, row):
+        """
+        Redraw a tile on its chunk.
+        """
+        size = self._chunk_size
+        chunk = self._chunks [row / size] [column / size]
+        rect = pygame.Rect ((column % size) * self._tile_width,
+                            (row % size) * self._tile_height,
+                            self._tile_width, self._tile_height)
+        surface = chunk._surface
+        tile = self._tiles [self._ids [row * self._columns + column]]
+        surface.fill (self._key_colour, rect)
+        if isinstance (tile, pygame.Surface):
+            surface.set_clip (rect)
+            surface.blit (tile, rect)
+            surface.set_clip (None)
+        elif tile is not None:
+            surface.fill (tile, rect)
+        # A chunk that isn't static is redrawn every frame anyway.
+        if chunk._static:
+            self.screen._invalidate (rect.move (chunk._rect.topleft))
+
+#------------------------------------------------------------------------------
+
+class _TileChunk (Object):
+    """
+    A square of a TileMap's tiles.
+    """
+
+    _collides = 0
+
+    def __init__ (self, screen, x, y, surface):
+        Object.__init__ (self, screen, x, y, surface, static=1)
+
 #------------------------------------------------------------------------------
 
 ###############################################################################
 ## Utility functions
 ###############################################################################
-def load_image(file, transparent=1):
+def load_image(file, transparent=1, shared=0):
     """Loads an image, prepares it for play. Returns a pygame.Surface object
     which you can give as the "image" parameter to Object.
 
@@ -1217,7 +3867,146 @@ def load_image(file, transparent=1):
                    Defaults to true.
                    The background colour is taken as the colour of the pixel
                    at (0,0) in the image.
+    shared -- if true, return the AssetManager's own copy of the image,
+              which is given to everyone else who asks for it too, so
+              it mustn't be drawn on. Otherwise you get a copy of your
+              own.
+
+    Each file is only read from disk once (see AssetManager).
+    """
+    image = assets.image(file, transparent)
+    if shared or not _is_filename(file):
+        return image
+    return image.copy()
+
+def load_sound(file, shared=0):
+    """
+    Load a sound file, returning a Sound object.
+
+    shared -- if true, return the AssetManager's own Sound, which is
+              given to everyone else who asks for it too, so its volume
+              mustn't be changed. Otherwise you get a copy of your own.
+
+    Each file is only read from disk once (see AssetManager).
+    """
+    sound = assets.sound(file)
+    if shared or sound is None or not _is_filename(file):
+        return sound
+    return _copy_sound(sound)
+
+def load_animation(nonrepeating_files, repeating_files=[], transparent=1):
+    """
+    Loads a number of files. Returns the "nonrepeating images" and
+    "repeating images" arguments needed for the Animation constructor.
+    """
+    return assets.animation(nonrepeating_files, repeating_files, transparent)
+
+def load_sprite_sheet(file, frame_width, frame_height, count=None,
+                      transparent=1, margin=0, spacing=0):
+    """
+    Loads an image made of lots of frames the same size, laid out in
+    rows, and returns a list of the frames, going along each row in
+    turn. Slices of the list can be given to the Animation constructor.
+
+    file -- the filename of the image to load
+    frame_width, frame_height -- the size of each frame
+    count -- how many frames there are, if the last row isn't full.
+             Defaults to as many as fit.
+    transparent -- as for load_image. The background colour is taken
+                   from the pixel at (0,0) of the whole image.
+    margin -- the number of pixels around the edge of the image
+    spacing -- the number of pixels between frames
+
+    The frames share the image's pixels, rather than being copies, so
+    they mustn't be drawn on.
+    """
+    sheet = assets.sheet(file, transparent)
+    (width, height) = sheet.get_size()
+    if frame_width <= 0 or frame_height <= 0:
+        raise GamesError, "Sprite sheet frames must have a positive size."
+    columns = (width - 2*margin + spacing) / (frame_width + spacing)
+    rows = (height - 2*margin + spacing) / (frame_height + spacing)
+    if count is None: count = columns * rows
+    if count > columns * rows or columns <= 0:
+        raise GamesError, 'Sprite sheet "%s" only has room for %d frames' % (
+            file, max(0, columns * rows))
+    frames = []
+    for i in xrange(count):
+        (row, column) = divmod(i, columns)
+        frames.append(sheet.subsurface(
+            (margin + column * (frame_width + spacing),
+             margin + row * (frame_height + spacing),
+             frame_width, frame_height)))
+    return frames
+
+def load_atlas(file, frames, transparent=1):
+    """
+    Loads an image with lots of smaller images in it, of any sizes, and
+    returns them.
+
+    file -- the filename of the image to load
+    frames -- either a list of (x, y, width, height) rectangles, in
+              which case a list of images is returned, or a dictionary
+              whose values are rectangles, in which case a dictionary
+              with the same keys is returned.
+    transparent -- as for load_sprite_sheet.
+
+    As for load_sprite_sheet, the images share the atlas's pixels.
+    """
+    sheet = assets.sheet(file, transparent)
+    bounds = sheet.get_rect()
+    def cut(rect, sheet=sheet, bounds=bounds, file=file):
+        rect = pygame.Rect(rect)
+        if not bounds.contains(rect):
+            raise GamesError, 'Frame %s is outside "%s"' % (tuple(rect), file)
+        return sheet.subsurface(rect)
+    if hasattr(frames, 'items'):
+        images = {}
+        for name, rect in frames.items():
+            images[name] = cut(rect)
+        return images
+    return map(cut, frames)
+
+def _whole_ticks(frames):
+    """
+    Return how many ticks a Timer waiting |frames| ticks really waits:
+    at least one, and a whole number, as when Timers counted up to
+    their intervals a tick at a time.
+    """
+    return max(1, int(math.ceil(frames)))
+
+def _tile(surface, tile, left, top, area):
+    """
+    Cover the rectangle |area| of |surface| with copies of |tile|, so
+    that the point (left, top) of a plane tiled with it is at the top
+    left of the surface.
     """
+    (w, h) = tile.get_size()
+    xs = range(area.left - (area.left + left) % w, area.right, w)
+    blits = [(tile, (x, y))
+             for y in range(area.top - (area.top + top) % h, area.bottom, h)
+             for x in xs]
+    if _have_blits:
+        surface.blits(blits, 0)
+    else:
+        for args in blits:
+            surface.blit(*args)
+
+## Loading files
+##
+## These do the work for AssetManager, and may be called on its worker
+## thread, so they don't convert images for the display.
+
+# The AssetManager used by load_image, load_sound and load_animation.
+assets = AssetManager()
+
+def _is_filename(file):
+    return type(file) in (type(""), type(u""))
+
+def _normalise_filename(file):
+    return os.path.normcase(os.path.abspath(file))
+
+def _decode_image(file, transparent, rle=1):
     if not _have_image:
         raise GamesError, "We don't have pygame.image, so can't load \"%s\"" % file
     try:
@@ -1226,36 +4015,31 @@ def load_image(file, transparent=1):
         raise GamesError, 'Could not load image "%s" %s'%(file, pygame.get_error())
     if transparent:
         corner = surface.get_at((0, 0))
-        surface.set_colorkey(corner, RLEACCEL)
-    return surface.convert()
+        surface.set_colorkey(corner, rle and RLEACCEL)
+    return surface
 
-def load_sound(file):
-    """
-    Load a sound file, returning a Sound object.
-    """
+def _decode_sound(file):
     if not _have_mixer:
-        raise GameError, "We don't have pygame.mixer, so can't load \"%s\"" % file
+        raise GamesError, "We don't have pygame.mixer, so can't load \"%s\"" % file
     try: return pygame.mixer.Sound(file)
     except pygame.error: return None
 
-def load_animation(nonrepeating_files, repeating_files=[], transparent=1):
+def _copy_sound(sound):
+    if not hasattr(sound, 'get_raw'):
+        return sound
+    copy = pygame.mixer.Sound(buffer=sound.get_raw())
+    copy.set_volume(sound.get_volume())
+    return copy
+
+def _sound_size(sound):
     """
-    Loads a number of files. Returns the "nonrepeating images" and
-    "repeating images" arguments needed for the Animation constructor.
+    Return roughly how many bytes of memory a Sound takes up.
     """
-    def _(name, transparent=transparent):
-        if not _have_image:
-            raise GamesError, "We don't have pygame.image, so can't load animation \"%s\"" % name
-        try: surface = pygame.image.load(name)
-        except pygame.error:
-            raise GamesError, 'Could not load animation frame "%s": %s' % (
-                name, pygame.get_error())
-        if transparent:
-            surface.set_colorkey(surface.get_at((0,0)), RLEACCEL)
-        return surface.convert()
-    nonrepeating = map(_, nonrepeating_files)
-    repeating    = map(_, repeating_files)
-    return nonrepeating, repeating
+    settings = pygame.mixer.get_init()
+    if not settings:
+        return 0
+    (frequency, format, channels) = settings
+    return int(sound.get_length() * frequency * channels * abs(format) / 8)
 
 def scale_image(image, x_scale, y_scale=None):
     """
@@ -1269,6 +4053,199 @@ def scale_image(image, x_scale, y_scale=None):
     y_size = y_size * y_scale
     return pygame.transform.scale (image, (x_size, y_size))
 
+## Fonts and rendered text
+##
+## Loading a font and rendering text are both slow, so fonts are kept
+## in _fonts, keyed by (face, size), and the text most recently rendered
+## is kept in _texts, keyed by (face, size, text, colour), least
+## recently used first. Rendered text surfaces are shared, so they
+## mustn't be drawn on.
+
+# The number of rendered pieces of text to remember.
+text_cache_size = 256
+
+_fonts = {}
+_texts = OrderedDict()
+
+def _get_font(face, size):
+    """
+    Return the font |face| (a filename, or None for the default font)
+    at |size|, loading it if we haven't already.
+    """
+    font = _fonts.get((face, size))
+    if font is None:
+        font = _fonts[(face, size)] = pygame.font.Font(face, size)
+    return font
+
+def _render_text(face, size, text, colour):
+    """
+    Return a surface with |text| rendered on it, antialiased, in the
+    given font, size and colour.
+    """
+    key = (face, size, text, _colour_key(colour))
+    surface = _texts.pop(key, None)
+    if surface is None:
+        surface = _get_font(face, size).render(text, 1, colour)
+        while len(_texts) >= text_cache_size and _texts:
+            _texts.popitem(last=0)
+    if text_cache_size > 0:
+        _texts[key] = surface
+    return surface
+
+## Masks
+##
+## A mask records which pixels of a surface aren't transparent. They're
+## kept for as long as the surfaces themselves, in a dictionary with
+## weak keys, so shared and cached surfaces share their masks too.
+
+_masks = weakref.WeakKeyDictionary()
+
+def _get_mask(surface):
+    mask = _masks.get(surface)
+    if mask is None:
+        mask = _masks[surface] = pygame.mask.from_surface(surface)
+    return mask
+
+def _masks_overlap(a, b):
+    """
+    Return true if the images of two objects, whose bounding boxes
+    overlap, have any solid pixels in common.
+    """
+    offset = (b._rect.left - a._rect.left, b._rect.top - a._rect.top)
+    return _get_mask(a._surface).overlap(_get_mask(b._surface), offset) is not None
+
+## Separating axes
+##
+## Two convex shapes don't overlap if and only if there's a line such
+## that their shadows on it don't overlap, and for polygons it's enough
+## to try the lines at right angles to their edges (and for a circle,
+## the line through its centre and the polygon's nearest vertex).
+
+_rect_axes = [(1, 0), (0, 1)]
+
+def _polygon_axes(shape, angle):
+    """
+    Turn a polygon's shape through |angle| degrees as it's drawn, and
+    work out the unit normals to its edges. Returns a pair (vertices,
+    normals); normals is None if the polygon isn't convex.
+    """
+    if angle:
+        a = math.pi/180 * angle
+        c, s = math.cos(a), math.sin(a)
+        points = [(x*c - y*s, x*s + y*c) for (x, y) in shape]
+    else:
+        points = [(float(x), float(y)) for (x, y) in shape]
+    n = len(points)
+    axes = []
+    turn = 0
+    for i in xrange(n):
+        x0, y0 = points[i]
+        x1, y1 = points[(i+1) % n]
+        x2, y2 = points[(i+2) % n]
+        cross = (x1-x0)*(y2-y1) - (y1-y0)*(x2-x1)
+        if cross:
+            if turn and (cross > 0) != (turn > 0):
+                return (points, None)
+            turn = cross
+        length = math.hypot(x1-x0, y1-y0)
+        if length:
+            axes.append((-(y1-y0)/length, (x1-x0)/length))
+            if n < 3:
+                # A line has to be tried along its length too.
+                axes.append(((x1-x0)/length, (y1-y0)/length))
+    return (points, axes)
+
+def _translate(points, dx, dy):
+    return [(x+dx, y+dy) for (x, y) in points]
+
+def _project(points, ax, ay):
+    """
+    Return the least and greatest positions of |points| along an axis.
+    """
+    values = [x*ax + y*ay for (x, y) in points]
+    return min(values), max(values)
+
+def _polygons_overlap(points1, axes1, points2, axes2):
+    for (ax, ay) in axes1 + axes2:
+        min1, max1 = _project(points1, ax, ay)
+        min2, max2 = _project(points2, ax, ay)
+        if max1 < min2 or max2 < min1:
+            return 0
+    return 1
+
+def _circle_polygon(cx, cy, radius, points, axes):
+    nearest = None
+    for (x, y) in points:
+        d = (x-cx)**2 + (y-cy)**2
+        if nearest is None or d < nearest[0]:
+            nearest = (d, x, y)
+    d, x, y = nearest
+    if d:
+        d = math.sqrt(d)
+        axes = axes + [((x-cx)/d, (y-cy)/d)]
+    for (ax, ay) in axes:
+        centre = cx*ax + cy*ay
+        low, high = _project(points, ax, ay)
+        if centre + radius < low or centre - radius > high:
+            return 0
+    return 1
+
+## Sweep and prune
+##
+## These find all the pairs of objects whose bounding boxes overlap
+## (and have some area), for Screen._collision_pass.
+
+def _sweep_and_prune(objects):
+    boxes = [(o._rect.left, o._rect.right, o._rect.top, o._rect.bottom, o)
+             for o in objects]
+    boxes.sort(key=lambda box: box[0])
+    pairs = []
+    for i in xrange(len(boxes)):
+        left, right, top, bottom, a = boxes[i]
+        for j in xrange(i+1, len(boxes)):
+            left2, right2, top2, bottom2, b = boxes[j]
+            if left2 >= right:
+                break
+            # The same tests as Rect.colliderect, which never counts a
+            # box with no width or height as touching one of its edges.
+            if right2 > left and top < bottom2 and top2 < bottom:
+                pairs.append((a, b))
+    return pairs
+
+def _sweep_and_prune_numpy(objects):
+    n = len(objects)
+    if n < 2:
+        return []
+    boxes = numpy.array([(o._rect.left, o._rect.right, o._rect.top,
+                          o._rect.bottom) for o in objects])
+    order = numpy.argsort(boxes[:, 0], kind='mergesort')
+    boxes = boxes[order]
+    lefts = boxes[:, 0]
+    # Box i needs comparing with boxes i+1 up to (not including) the
+    # first one that starts at or after its right edge.
+    ends = numpy.searchsorted(lefts, boxes[:, 1], side='left')
+    counts = numpy.maximum(ends - numpy.arange(n) - 1, 0)
+    total = int(counts.sum())
+    if not total:
+        return []
+    first = numpy.repeat(numpy.arange(n), counts)
+    starts = numpy.cumsum(counts) - counts
+    second = first + 1 + numpy.arange(total) - numpy.repeat(starts, counts)
+    keep = ((boxes[second, 1] > boxes[first, 0]) &
+            (boxes[first, 2] < boxes[second, 3]) &
+            (boxes[second, 2] < boxes[first, 3]))
+    first = order[first[keep]].tolist()
+    second = order[second[keep]].tolist()
+    return [(objects[i], objects[j]) for i, j in zip(first, second)]
+
+def _colour_key(colour):
+    """
+    Return a colour (or None) in a form that can be part of a
+    dictionary key, so that equal colours give equal keys.
+    """
+    try: return tuple(colour)
+    except TypeError: return colour # None, or a mapped colour number
+
 ###############################################################################
 ## Test code
 ###############################################################################
@@ -0,0 +1,1126 @@
+### Tests for the LiveWires games module.
+###
+### Run "python -m unittest livewires.test_games" for them all.
+###############################################################################
+# Copyright the LiveWires contributors.  All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# Neither name of Scripture Union nor LiveWires nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# ``AS IS'' AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SCRIPTURE UNION
+# OR THE CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+###############################################################################
+
+###############################################################################
+#
+# Most of the speed-ups in the games module keep some structure up to
+# date so as not to look at everything every frame: a grid of objects,
+# a pre-drawn static layer, a timing wheel, remembered collisions. The
+# tests here check each one against the slow, obvious way of getting
+# the same answer, with random objects doing random things, on a
+# headless Screen.
+#
+# There can only be one Screen, so all the tests share it, and each
+# starts by clearing it.
+
+import math
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import pygame
+from livewires import games, colour
+
+WIDTH = 320
+HEIGHT = 240
+
+COLOURS = (colour.red, colour.green, colour.blue, colour.yellow,
+           colour.white)
+
+
+class TestScreen (games.Screen):
+    """
+    A headless Screen whose tick method calls whatever the current
+    test wants called every tick.
+    """
+
+    def __init__ (self, width, height):
+        self.init_screen (width, height, headless=1)
+        self.test_tick = None
+
+    def tick (self):
+        if self.test_tick: self.test_tick ()
+
+_screen = None
+
+def get_screen ():
+    global _screen
+    if _screen is None:
+        _screen = TestScreen (WIDTH, HEIGHT)
+    return _screen
+
+
+class ScreenTestCase (unittest.TestCase):
+
+    def setUp (self):
+        random.seed (0)
+        screen = self.screen = get_screen ()
+        screen.clear ()
+        screen.set_view (0, 0)
+        screen.clear_background_layers ()
+        screen.set_background_colour (colour.black)
+        screen.enable_collisions (0)
+        screen.test_tick = None
+
+    def tearDown (self):
+        self.screen.clear ()
+        self.screen.test_tick = None
+
+    def random_polygon (self, static=0):
+        width = random.randint (1, 90)
+        height = random.randint (1, 90)
+        return games.Polygon (self.screen,
+                              random.randint (-100, WIDTH + 100),
+                              random.randint (-100, HEIGHT + 100),
+                              ((0, 0), (width, 0), (0, height)),
+                              random.choice (COLOURS), static=static)
+
+###############################################################################
+## The grid
+###############################################################################
+
+class GridTest (ScreenTestCase):
+    """
+    Screen.overlapping_objects answers from the grid of cells that
+    objects are filed under; it should give the same objects, in the
+    same order, as looking at every one.
+    """
+
+    def scan (self, rect):
+        rect = pygame.Rect (rect)
+        return [o for o in self.screen.all_objects ()
+                if rect.colliderect (o._rect)]
+
+    def random_rect (self):
+        return (random.randint (-150, WIDTH + 150),
+                random.randint (-150, HEIGHT + 150),
+                random.choice ((0, 1, 5, 30, 64, 65, 200)),
+                random.choice ((0, 1, 5, 30, 64, 65, 200)))
+
+    def check_queries (self, n):
+        for i in xrange (n):
+            rect = self.random_rect ()
+            self.assertEqual (self.screen.overlapping_objects (rect),
+                              self.scan (rect))
+
+    def test_queries (self):
+        for i in xrange (100):
+            self.random_polygon ()
+        # Something empty, and something bigger than many cells.
+        games.Sprite (self.screen, 50, 50, pygame.Surface ((0, 10)))
+        games.Sprite (self.screen, 100, 100, pygame.Surface ((300, 200)))
+        self.check_queries (500)
+
+    def test_changes (self):
+        objects = [self.random_polygon () for i in xrange (60)]
+        for round in xrange (50):
+            for i in xrange (10):
+                object = random.choice (objects)
+                action = random.random ()
+                if action < 0.4:
+                    object.move_by (random.randint (-80, 80),
+                                    random.randint (-80, 80))
+                elif action < 0.5:
+                    object.move_to (random.randint (-100, WIDTH + 100),
+                                    random.randint (-100, HEIGHT + 100))
+                elif action < 0.6:
+                    object.raise_object ()
+                elif action < 0.7:
+                    object.lower_object ()
+                elif action < 0.8:
+                    object.rotate_by (random.randint (0, 90))
+                elif action < 0.9:
+                    objects.remove (object)
+                    object.destroy ()
+                    objects.append (self.random_polygon ())
+                else:
+                    object.set_layer (random.randint (-1, 1))
+            self.check_queries (20)
+
+
+###############################################################################
+## The static layer
+###############################################################################
+
+class StaticLayerTest (ScreenTestCase):
+    """
+    Static objects are drawn once into a static layer, which is only
+    patched up where they change; the layer, and the window, should
+    look exactly as if everything had been drawn from scratch.
+    """
+
+    def draw (self, objects):
+        screen = self.screen
+        surface = screen._background.copy ()
+        for object in objects:
+            surface.blit (object._surface, screen._screen_rect (object._rect))
+        return surface
+
+    def assertLooksLike (self, surface, expected):
+        got = pygame.image.tostring (surface, 'RGB')
+        wanted = pygame.image.tostring (expected, 'RGB')
+        if got != wanted:
+            for i in xrange (0, len (got), 3):
+                if got [i:i+3] != wanted [i:i+3]: break
+            (y, x) = divmod (i / 3, surface.get_width ())
+            self.fail ("%s at (%d, %d), not %s" % (
+                surface.get_at ((x, y)), x, y, expected.get_at ((x, y))))
+
+    def check (self):
+        screen = self.screen
+        objects = screen.all_objects ()
+        statics = [o for o in objects if o._static]
+        self.assertLooksLike (screen._static_layer, self.draw (statics))
+        self.assertLooksLike (screen._display, self.draw (objects))
+
+    def random_bubble (self, static=0):
+        "A see-through Sprite, which mustn't be drawn twice."
+        surface = pygame.Surface ((30, 30), pygame.SRCALPHA, 32)
+        surface.fill ((0, 0, 0, 0))
+        pygame.draw.circle (surface, random.choice (COLOURS) + (128,),
+                            (15, 15), 12)
+        return games.Sprite (self.screen, random.randint (0, WIDTH),
+                             random.randint (0, HEIGHT), surface,
+                             static=static)
+
+    def test_frames (self):
+        screen = self.screen
+        objects = []
+        for i in xrange (40):
+            objects.append (self.random_polygon (static=i % 2))
+            objects.append (self.random_bubble (static=i % 3 == 0))
+
+        # Moving objects have to be moved while the Screen is ticking,
+        # after they've been erased.
+        def tick (objects=objects, self=self):
+            for i in xrange (5):
+                object = random.choice (objects)
+                action = random.random ()
+                if action < 0.4:
+                    object.move_by (random.randint (-20, 20),
+                                    random.randint (-20, 20))
+                elif action < 0.5:
+                    object.treat_as_static ()
+                elif action < 0.6:
+                    object.treat_as_dynamic ()
+                elif action < 0.7:
+                    object.raise_object ()
+                elif action < 0.8:
+                    object.lower_object ()
+                elif action < 0.9:
+                    objects.remove (object)
+                    object.destroy ()
+                    objects.append (self.random_bubble (static=1))
+                elif isinstance (object, games.Polygon):
+                    object.set_colour (random.choice (COLOURS))
+        screen.test_tick = tick
+
+        for frame in xrange (150):
+            screen.step (1)
+            self.check ()
+
+    def test_background (self):
+        screen = self.screen
+        for i in xrange (30):
+            self.random_polygon (static=1)
+        screen.step (1)
+        tile = pygame.Surface ((25, 15))
+        tile.fill (colour.dark_blue)
+        pygame.draw.line (tile, colour.white, (0, 0), (24, 14))
+        screen.set_background (tile)
+        screen.step (1)
+        self.check ()
+        screen.set_background_colour (colour.dark_green)
+        screen.step (1)
+        self.check ()
+
+
+class BackgroundLayerTest (StaticLayerTest):
+    """
+    Background layers are only drawn where the window's being rebuilt;
+    the window should look as if they'd been tiled across all of it.
+    """
+
+    def draw (self, objects):
+        screen = self.screen
+        surface = screen._background.copy ()
+        (x, y) = screen.get_background_scroll ()
+        (x, y) = (x + screen.get_view () [0], y + screen.get_view () [1])
+        for tile, (px, py) in self.layers:
+            (width, height) = tile.get_size ()
+            left = int (math.floor (x * px)) % width
+            top = int (math.floor (y * py)) % height
+            for i in xrange (-left, WIDTH, width):
+                for j in xrange (-top, HEIGHT, height):
+                    surface.blit (tile, (i, j))
+        for object in objects:
+            surface.blit (object._surface, screen._screen_rect (object._rect))
+        return surface
+
+    def test_frames (self):
+        screen = self.screen
+        sky = pygame.Surface ((37, 23))
+        sky.fill (colour.dark_blue)
+        pygame.draw.line (sky, colour.light_grey, (0, 0), (36, 22))
+        stars = pygame.Surface ((80, 61))
+        stars.fill ((0, 0, 0))
+        stars.set_colorkey ((0, 0, 0))
+        for i in xrange (2):
+            stars.set_at ((random.randrange (80), random.randrange (61)),
+                          colour.white)
+        clouds = pygame.Surface ((30, 30), pygame.SRCALPHA, 32)
+        clouds.fill ((0, 0, 0, 0))
+        pygame.draw.circle (clouds, (255, 255, 255, 100), (10, 10), 6)
+        self.layers = [(sky, (0.25, 0.25)), (stars, (1, 0.5)),
+                       (clouds, (0.75, 1.5))]
+        for tile, parallax in self.layers:
+            screen.add_background_layer (tile, parallax)
+
+        objects = []
+        for i in xrange (30):
+            objects.append (self.random_polygon (static=i % 2))
+        self.moving_view = 1
+        def tick (objects=objects, screen=screen, self=self):
+            action = random.random ()
+            if action < 0.2 and self.moving_view:
+                screen.move_view (random.randint (-5, 5),
+                                  random.randint (-5, 5))
+            elif action < 0.8:
+                screen.scroll_background (random.uniform (-3, 3),
+                                          random.uniform (-3, 3))
+            object = random.choice (objects)
+            object.move_by (random.randint (-10, 10), random.randint (-10, 10))
+        screen.test_tick = tick
+
+        for frame in xrange (100):
+            screen.step (1)
+            self.check ()
+            if frame == 50:
+                # With just the stars, and the view staying put, moving
+                # the layers only rebuilds bits of the window.
+                self.layers = [(stars, (1, 0.5))]
+                self.moving_view = 0
+                screen.clear_background_layers ()
+                screen.add_background_layer (stars, (1, 0.5))
+
+    def test_background (self):
+        self.layers = []
+        StaticLayerTest.test_background (self)
+
+###############################################################################
+## The main loop
+###############################################################################
+
+class MainloopTest (ScreenTestCase):
+    """
+    With max_catch_up, mainloop runs extra ticks when it falls behind,
+    but only then, and no more than it's allowed.
+    """
+
+    def run_loop (self, frames):
+        "Run mainloop for |frames| frames, and return the ticks in each."
+        screen = self.screen
+        dues = []
+        ticks_due = screen._ticks_due
+        def record (fps, max_catch_up, ticks_due=ticks_due, dues=dues):
+            due = ticks_due (fps, max_catch_up)
+            dues.append (due)
+            return due
+        def tick (screen=screen, dues=dues, frames=frames):
+            if len (dues) >= frames: screen.quit ()
+        screen._ticks_due = record
+        screen.test_tick = tick
+        try:
+            screen.mainloop (fps=200, max_catch_up=4)
+        finally:
+            del screen._ticks_due
+        return dues
+
+    def test_first_frame (self):
+        self.assertEqual (self.run_loop (3) [0], 1)
+        # Starting again after a pause doesn't count as falling behind.
+        pygame.time.delay (100)
+        self.assertEqual (self.run_loop (3) [0], 1)
+
+    def test_stall (self):
+        screen = self.screen
+        screen._next_tick = pygame.time.get_ticks () - 1000
+        self.assertEqual (screen._ticks_due (50, 4), 5)
+        screen._next_tick = pygame.time.get_ticks () - 50
+        self.assertEqual (screen._ticks_due (50, 4), 3)
+
+###############################################################################
+## Timers
+###############################################################################
+
+class Ticker (games.Sprite, games.Timer):
+    """
+    A Timer which notes down when it's ticked, and sometimes stops,
+    restarts or changes its own interval when it is.
+    """
+
+    def __init__ (self, test, name, interval):
+        self.init_sprite (test.screen, random.randint (0, WIDTH),
+                          random.randint (0, HEIGHT), test.dot)
+        self.init_timer (interval)
+        self.test = test
+        self.name = name
+
+    def tick (self):
+        self.test.fired.append (self.name)
+        action = random.random ()
+        if action < 0.05:
+            self.stop ()
+            self.test.own_actions [self] = ('stop', None)
+        elif action < 0.1:
+            self.start ()
+            self.test.own_actions [self] = ('start', None)
+        elif action < 0.15:
+            interval = random.choice (TimerTest.intervals)
+            self.set_interval (interval)
+            self.test.own_actions [self] = ('set_interval', interval)
+
+
+class TimerTest (ScreenTestCase):
+    """
+    Timers wait in a timing wheel until they're due. They should tick
+    in the same order, on the same ticks, as they did when every Timer
+    counted every tick up to its interval; that old way is done here
+    alongside, as a model, with the same things done to both.
+    """
+
+    intervals = (0, 1, 2, 2.5, 3, 7, 100, 255, 256, 257, 600)
+
+    # The model of each Timer is a list [running, count, interval].
+
+    def model_tick (self):
+        "Return the names of the Timers that would have ticked."
+        names = []
+        for object in self.screen.all_objects ():
+            model = self.models [object]
+            if not model [0]: continue
+            model [1] = model [1] + 1
+            if model [1] >= model [2]:
+                model [1] = 0
+                names.append (object.name)
+                if self.own_actions.has_key (object):
+                    self.model_action (object, self.own_actions.pop (object))
+        return names
+
+    def model_action (self, object, action):
+        (action, interval) = action
+        model = self.models [object]
+        if action == 'stop':
+            model [0] = 0
+        elif action == 'start':
+            model [0:2] = [1, 0]
+        else:
+            model [2] = interval
+
+    def add_ticker (self):
+        interval = random.choice (self.intervals)
+        ticker = Ticker (self, len (self.models), interval)
+        self.models [ticker] = [1, 0, interval]
+
+    def test_odd_intervals (self):
+        "Intervals that aren't whole numbers of ticks, counted as before."
+        self.dot = pygame.Surface ((1, 1))
+        self.fired = []
+        self.own_actions = {}
+        random.seed (1)
+        tickers = [Ticker (self, interval, interval)
+                   for interval in (0, -1, 0.5, 1, 2.5, 3)]
+        for ticker in tickers:
+            ticker.tick = lambda ticker=ticker, self=self: \
+                              self.fired.append (ticker.name)
+        self.screen.step (300, render=0)
+        counts = [self.fired.count (ticker.name) for ticker in tickers]
+        self.assertEqual (counts, [300, 300, 300, 300, 100, 100])
+
+    def test_order (self):
+        screen = self.screen
+        self.dot = pygame.Surface ((1, 1))
+        self.models = {}
+        self.own_actions = {}
+        self.fired = []
+        self.ticked = 0
+        self.calls = {}
+        for i in xrange (30):
+            self.add_ticker ()
+
+        # Screen.tick runs after all the Timers (and callbacks) due on
+        # that tick, so it can check what happened and change things.
+        def tick (self=self, screen=screen):
+            now = screen._ticks
+            names = [name for name in self.fired if type (name) is type (0)]
+            calls = [name for name in self.fired if type (name) is not type (0)]
+            self.assertEqual (names, self.model_tick ())
+            self.assertEqual (self.own_actions, {})
+            self.assertEqual (sorted (calls), sorted (self.calls.pop (now, [])))
+            self.ticked = self.ticked + len (self.fired)
+            self.fired = []
+
+            for i in xrange (2):
+                object = random.choice (self.models.keys ())
+                action = random.random ()
+                if action < 0.1:
+                    object.stop ()
+                    self.model_action (object, ('stop', None))
+                elif action < 0.2:
+                    object.start ()
+                    self.model_action (object, ('start', None))
+                elif action < 0.3:
+                    interval = random.choice (self.intervals)
+                    object.set_interval (interval)
+                    self.model_action (object, ('set_interval', interval))
+                elif action < 0.35:
+                    del self.models [object]
+                    object.destroy ()
+                    self.add_ticker ()
+                elif action < 0.5:
+                    frames = random.choice ((0, 1, 2, 255, 256, 257, 600))
+                    name = ('call', now, i)
+                    screen.call_later (frames, lambda self=self, name=name:
+                                                   self.fired.append (name))
+                    self.calls.setdefault (now + max (1, frames), []).append (
+                        name)
+        screen.test_tick = tick
+
+        screen.step (3000, render=0)
+        self.failUnless (self.ticked > 3000)
+
+
+###############################################################################
+## Collisions
+###############################################################################
+
+class Bouncer (games.Circle, games.Mover):
+    """
+    A Circle that wanders about, and notes down what it's told it has
+    run into, if it asked to be told.
+    """
+
+    def __init__ (self, test, collide):
+        self.init_circle (test.screen, random.randint (0, WIDTH),
+                          random.randint (0, HEIGHT),
+                          random.randint (0, 20), random.choice (COLOURS))
+        self.init_mover (random.randint (-3, 3), random.randint (-3, 3))
+        self.test = test
+        if collide: self.enable_collide ()
+
+    def moved (self):
+        (x, y) = self.pos ()
+        if not (0 <= x <= WIDTH and 0 <= y <= HEIGHT):
+            self.move_to (x % WIDTH, y % HEIGHT)
+
+    def collide (self, other):
+        self.test.collisions.append ((self, other))
+
+
+class Vane (games.Circle):
+    "A Circle that only overlaps things while it's facing right."
+
+    def filter_overlaps (self, object):
+        return self.angle () < 180
+
+
+class ContactTest (ScreenTestCase):
+    """
+    After each tick, the Screen finds every overlapping pair at once
+    and remembers them; overlapping_objects should give the same
+    answers from those as it does working them out afresh, and collide
+    should be called for exactly those pairs.
+    """
+
+    def random_sprite (self):
+        "A Sprite tested for overlaps pixel by pixel."
+        surface = pygame.Surface ((30, 30))
+        surface.fill ((0, 0, 0))
+        surface.set_colorkey ((0, 0, 0))
+        pygame.draw.circle (surface, colour.white, (15, 15), 14)
+        sprite = games.Sprite (self.screen, random.randint (0, WIDTH),
+                               random.randint (0, HEIGHT), surface)
+        sprite.set_precise ()
+        return sprite
+
+    def check (self):
+        screen = self.screen
+        objects = screen.all_objects ()
+        pairs = screen.get_contacts ()
+        self.failIf (pairs is None)
+        remembered = [o.overlapping_objects () for o in objects]
+        screen.forget_contacts ()
+        worked_out = [o.overlapping_objects () for o in objects]
+        self.assertEqual (remembered, worked_out)
+
+        touching = []
+        for object, others in zip (objects, worked_out):
+            for other in others:
+                if object._key < other._key:
+                    touching.append ((object, other))
+        self.assertEqual (pairs, touching)
+
+        expected = []
+        for a, b in touching:
+            if screen._colliders.has_key (a): expected.append ((a, b))
+            if screen._colliders.has_key (b): expected.append ((b, a))
+        self.assertEqual (sorted (self.collisions, key=self.pair_key),
+                          sorted (expected, key=self.pair_key))
+        self.collisions = []
+
+    def pair_key (self, pair):
+        return (pair [0]._key, pair [1]._key)
+
+    def run_contacts (self):
+        screen = self.screen
+        screen.enable_collisions ()
+        self.collisions = []
+        for i in xrange (60):
+            Bouncer (self, collide=i % 2)
+        for i in xrange (20):
+            self.random_polygon (static=i % 2)
+            self.random_sprite ()
+        games.Sprite (screen, 100, 100, pygame.Surface ((0, 50)))
+        games.Sprite (screen, 200, 100, pygame.Surface ((50, 0)))
+        screen.test_tick = self.check
+        screen.step (100)
+
+    def test_contacts (self):
+        self.run_contacts ()
+
+    def same_answers (self):
+        "Check remembered overlaps against working them out afresh."
+        screen = self.screen
+        objects = screen.all_objects ()
+        self.failUnless (screen.get_contacts () is None)
+        remembered = [o.overlapping_objects () for o in objects]
+        screen.forget_contacts ()
+        self.assertEqual (remembered,
+                          [o.overlapping_objects () for o in objects])
+
+    def shuffle (self):
+        "Ask some questions, then move and turn things within the tick."
+        objects = self.screen.all_objects ()
+        for object in random.sample (objects, 10):
+            object.overlapping_objects ()
+        for object in random.sample (objects, 10):
+            object.move_by (random.randint (-20, 20), random.randint (-20, 20))
+        self.same_answers ()
+        # Remember them again, as at the end of a tick.
+        self.screen._collision_pass ()
+        for object in random.sample (objects, 10):
+            object.rotate_by (random.randint (1, 359))
+        self.same_answers ()
+
+    def test_changes_within_tick (self):
+        screen = self.screen
+        screen.enable_collisions ()
+        for i in xrange (40):
+            Bouncer (self, collide=0)
+            self.random_polygon ()
+            self.random_sprite ()
+        screen.test_tick = self.shuffle
+        screen.step (30)
+
+    def test_turning (self):
+        # Whether a Vane overlaps anything depends on which way it's
+        # facing, which doesn't change its image.
+        screen = self.screen
+        screen.enable_collisions ()
+        vane = Vane (screen, 100, 100, 10, colour.red)
+        other = games.Circle (screen, 105, 100, 10, colour.red)
+        screen.step (1)
+        self.assertEqual (vane.overlapping_objects (), [other])
+        vane.rotate_to (270)
+        self.assertEqual (vane.overlapping_objects (), [])
+        vane.rotate_to (0)
+        self.assertEqual (vane.overlapping_objects (), [other])
+
+    def test_contacts_without_numpy (self):
+        have_numpy = games._have_numpy
+        games._have_numpy = 0
+        try:
+            self.run_contacts ()
+        finally:
+            games._have_numpy = have_numpy
+
+
+class SeparatingAxesTest (ScreenTestCase):
+    """
+    Polygons and Circles test overlaps exactly, with separating axes;
+    the answers should be the ones their pixel masks give, except for
+    concave polygons, which still go by their bounding boxes.
+    """
+
+    square = ((-20, -20), (20, -20), (20, 20), (-20, 20))
+
+    def answers (self, a, b):
+        "Return the exact, mask and bounding box answers for a and b."
+        a.set_precise (0)
+        b.set_precise (0)
+        exact = not not a.overlaps (b)
+        a.set_precise ()
+        b.set_precise ()
+        mask = not not a.overlaps (b)
+        a.set_precise (0)
+        b.set_precise (0)
+        return exact, mask, not not a._rect.colliderect (b._rect)
+
+    def check (self, a, b, expected):
+        exact, mask, rect = self.answers (a, b)
+        self.assertEqual ((exact, mask), (expected, expected))
+        self.assertEqual (not not b.overlaps (a), expected)
+        self.failUnless (rect)
+        a.destroy ()
+        b.destroy ()
+
+    def diamond (self, x, y):
+        diamond = games.Polygon (self.screen, x, y, self.square, colour.red)
+        diamond.rotate_to (45)
+        return diamond
+
+    def test_polygons (self):
+        # A square turned into a diamond and another square, corner to
+        # edge, 5 pixels apart and 4 pixels overlapping.
+        screen = self.screen
+        for c, expected in ((18, 0), (11, 1)):
+            square = games.Polygon (screen, 100, 100, self.square, colour.red)
+            self.check (square, self.diamond (120 + c, 80 - c), expected)
+
+    def test_circles (self):
+        screen = self.screen
+        for c, expected in ((28.3, 0), (21.2, 1)):
+            circle = games.Circle (screen, 100 + c, 100 - c, 15, colour.red)
+            self.check (self.diamond (100, 100), circle, expected)
+            circle = games.Circle (screen, 100 + c, 100 - c, 15, colour.red)
+            self.check (circle, self.diamond (100, 100), expected)
+        # Off a square's corner, only the line towards its nearest
+        # vertex separates it from a circle.
+        for c, expected in ((13, 0), (8, 1)):
+            square = games.Polygon (screen, 100, 100, self.square, colour.red)
+            circle = games.Circle (screen, 120 + c, 80 - c, 15, colour.red)
+            self.check (square, circle, expected)
+        for c, expected in ((32, 0), (25, 1)):
+            a = games.Circle (screen, 100, 100, 20, colour.red)
+            b = games.Circle (screen, 100 + c, 100 + c, 20, colour.red)
+            self.check (a, b, expected)
+
+    def test_boxes (self):
+        # Anything else is as solid as its bounding box.
+        screen = self.screen
+        surface = pygame.Surface ((40, 40))
+        surface.fill (colour.white)
+        surface.set_colorkey (colour.black)
+        for c, expected in ((18, 0), (11, 1)):
+            sprite = games.Sprite (screen, 120 + c, 80 - c, surface)
+            self.check (self.diamond (100, 100), sprite, expected)
+
+    def test_convexity (self):
+        # A small square in the corner of a triangle's bounding box
+        # misses it, but a concave polygon counts as overlapping
+        # anything its bounding box does.
+        screen = self.screen
+        small = ((-5, -5), (5, -5), (5, 5), (-5, 5))
+        triangle = games.Polygon (screen, 100, 100,
+                                  ((0, 0), (60, 0), (0, 60)), colour.red)
+        self.check (triangle, games.Polygon (screen, 140, 140, small,
+                                             colour.red), 0)
+        chevron = games.Polygon (screen, 100, 100,
+                                 ((0, 0), (60, 30), (0, 60), (20, 30)),
+                                 colour.red)
+        outside = games.Polygon (screen, 150, 108, small, colour.red)
+        self.assertEqual (self.answers (chevron, outside), (1, 0, 1))
+        self.assertEqual (self.answers (outside, chevron), (1, 0, 1))
+
+    def random_shape (self):
+        screen = self.screen
+        x = random.uniform (100, 160)
+        y = random.uniform (100, 160)
+        if random.random () < 0.3:
+            return games.Circle (screen, x, y, random.randint (3, 30),
+                                 colour.red)
+        # Points in order around an ellipse make a convex polygon.
+        rx = random.uniform (3, 40)
+        ry = random.uniform (3, 40)
+        angles = [random.uniform (0, 2*math.pi)
+                  for i in xrange (random.randint (3, 6))]
+        angles.sort ()
+        shape = [(rx * math.cos (a), ry * math.sin (a)) for a in angles]
+        polygon = games.Polygon (screen, x, y, shape, colour.red)
+        polygon.rotate_to (random.uniform (0, 360))
+        return polygon
+
+    def test_random (self):
+        # Where the answers differ, the shapes have to be so nearly
+        # touching that moving one by two pixels changes the exact one.
+        for i in xrange (300):
+            a = self.random_shape ()
+            b = self.random_shape ()
+            exact, mask, rect = self.answers (a, b)
+            if rect and exact != mask:
+                x, y = b.pos ()
+                nudged = []
+                for dx, dy in ((-2, 0), (2, 0), (0, -2), (0, 2)):
+                    b.move_to (x + dx, y + dy)
+                    nudged.append (not not a.overlaps (b))
+                self.failIf (nudged == [exact] * 4)
+            a.destroy ()
+            b.destroy ()
+
+
+###############################################################################
+## Animations
+###############################################################################
+
+class OldAnimation (games.Sprite, games.Timer):
+    """
+    An Animation as it used to be, keeping its own lists of images
+    and its own Timer.
+    """
+
+    def __init__ (self, screen, x, y, nonrepeating_images, repeating_images,
+                  n_repeats, repeat_interval):
+        self.nonrepeating_images = list (nonrepeating_images)
+        self.repeating_images = list (repeating_images)
+        self.n_repeats = n_repeats or -1
+        self.next_image ()
+        games.Object.__init__ (self, screen, x, y, self.next_image ())
+        self.init_timer (repeat_interval)
+
+    def next_image (self):
+        if self.n_repeats==0: return None
+        if self.n_repeats>0: self.n_repeats -= 1
+        if self.nonrepeating_images:
+            return self.nonrepeating_images.pop (0)
+        if not self.repeating_images: return None
+        self.repeating_images = [self.repeating_images [-1]] \
+                                + self.repeating_images [:-1]
+        return self.repeating_images [0]
+
+    def tick (self):
+        new_image = self.next_image ()
+        if new_image is None: self.destroy ()
+        else: self.replace_image (new_image)
+
+
+class AnimationTest (ScreenTestCase):
+    """
+    Animations sharing a FrameTable and a FrameClock should show the
+    same images, and disappear at the same time, as they always did
+    with lists of images and a Timer each.
+    """
+
+    def test_frames (self):
+        screen = self.screen
+        images = [pygame.Surface ((i, 1)) for i in xrange (1, 7)]
+        once_lists = ([], images [:1], images [:3])
+        repeating_lists = ([], images [3:4], images [3:])
+        clocks = {}
+        animations = []
+        for once in once_lists:
+            for repeating in repeating_lists:
+                # The first image is skipped, so without repeating
+                # images there have to be two.
+                if len (once) < 2 and not repeating:
+                    continue
+                table = games.FrameTable (once, repeating)
+                for n_repeats in (0, 2, 3, 5, 9):
+                    for interval in (1, 2, 3):
+                        if not clocks.has_key (interval):
+                            clocks [interval] = games.FrameClock (screen,
+                                                                  interval)
+                        args = (screen, 100, 100, once, repeating,
+                                n_repeats, interval)
+                        animations.append ((
+                            apply (OldAnimation, args),
+                            apply (games.Animation, args),
+                            games.Animation (screen, 100, 100, table, None,
+                                             n_repeats, interval,
+                                             clock=clocks [interval])))
+
+        def shown (animation):
+            if animation._gone:
+                return None
+            return (animation._orig_surface, animation.nonrepeating_images,
+                    animation.repeating_images)
+
+        def check ():
+            for old, alone, clocked in animations:
+                self.assertEqual (shown (alone), shown (old))
+                self.assertEqual (shown (clocked), shown (old))
+        check ()
+        screen.test_tick = check
+        screen.step (40)
+        # Only the ones that go on for ever are left.
+        for old, alone, clocked in animations:
+            self.assertEqual (not old._gone,
+                              old.n_repeats < 0 and old.repeating_images != [])
+        self.failUnless (clocks [2].members ())
+
+
+###############################################################################
+## Mover groups
+###############################################################################
+
+class Drifter (games.Circle, games.Mover):
+    "A Circle that moves in a straight line, counting its moved calls."
+
+    def __init__ (self, screen, x, y, dx, dy, da, per_second):
+        self.init_circle (screen, x, y, 5, colour.red)
+        self.init_mover (dx, dy, da, per_second)
+        self.moves = 0
+
+    def moved (self):
+        self.moves = self.moves + 1
+
+
+class MoverGroupTest (ScreenTestCase):
+    """
+    A MoverGroup moves its Movers with NumPy; they should end up just
+    where they'd have got to moving themselves.
+    """
+
+    def test_positions (self):
+        if not games._have_numpy:
+            return
+        screen = self.screen
+        group = games.MoverGroup (screen)
+        pairs = []
+        for i in xrange (50):
+            args = (random.uniform (0, WIDTH), random.uniform (0, HEIGHT),
+                    random.uniform (-3, 3), random.uniform (-3, 3),
+                    random.choice ((0, 0, 5, -2.5)), i % 5 == 0)
+            alone = apply (Drifter, (screen,) + args)
+            grouped = apply (Drifter, (screen,) + args)
+            group.add (grouped, notify=1)
+            pairs.append ((alone, grouped))
+        screen.step (60)
+        for alone, grouped in pairs:
+            self.assertEqual (grouped.pos (), alone.pos ())
+            self.assertEqual (grouped.angle (), alone.angle ())
+            self.assertEqual (grouped._rect, alone._rect)
+            self.assertEqual (grouped.moves, alone.moves)
+
+
+###############################################################################
+## Tile maps
+###############################################################################
+
+class TileMapTest (ScreenTestCase):
+    """
+    A TileMap should show each tile as it says, tile 0 included, and
+    only leave the ones that are None see-through.
+    """
+
+    floor = (0, 128, 0)
+    wall = (128, 128, 128)
+
+    def colour_at (self, tilemap, column, row):
+        rect = tilemap.tile_rect (column, row)
+        return tuple (self.screen._display.get_at (rect.center)) [:3]
+
+    def test_ids (self):
+        screen = self.screen
+        ids = [[random.randint (0, 2) for i in xrange (20)]
+               for j in xrange (12)]
+        tiles = [self.floor, self.wall, None]
+        tilemap = games.TileMap (screen, 0, 0, 20, 12, 10, 10, tiles, ids,
+                                 chunk_size=8)
+        screen.step (1)
+        expected = {0: self.floor, 1: self.wall, 2: (0, 0, 0)}
+        for row in xrange (12):
+            for column in xrange (20):
+                self.assertEqual (self.colour_at (tilemap, column, row),
+                                  expected [ids [row] [column]])
+        tilemap.destroy ()
+
+        # Without any ids, it's all tile 0.
+        image = pygame.Surface ((10, 10))
+        image.fill (self.wall)
+        tilemap = games.TileMap (screen, 0, 0, 20, 12, 10, 10, [image],
+                                 chunk_size=8)
+        screen.step (1)
+        for row in xrange (12):
+            for column in xrange (20):
+                self.assertEqual (self.colour_at (tilemap, column, row),
+                                  self.wall)
+
+    def test_key_colour (self):
+        # The chunks leave out one colour, which no tile can be.
+        screen = self.screen
+        screen.set_background_colour (colour.white)
+        tiles = [(255, 0, 255), (0, 0, 0), (0, 0, 10), (0, 0, 1), None]
+        tilemap = games.TileMap (screen, 0, 0, 5, 1, 10, 10, tiles,
+                                 [range (5)])
+        screen.step (1)
+        for id in xrange (4):
+            self.assertEqual (self.colour_at (tilemap, id, 0), tiles [id])
+        self.assertEqual (self.colour_at (tilemap, 4, 0), (255, 255, 255))
+
+
+###############################################################################
+## Text
+###############################################################################
+
+class TextTest (ScreenTestCase):
+    """
+    Rendered text is remembered, so the same words in the same size
+    and colour are only rendered once.
+    """
+
+    def test_cache (self):
+        screen = self.screen
+        a = games.Text (screen, 100, 100, "Hello", 20, colour.red)
+        b = games.Text (screen, 200, 100, "Hello", 20, colour.red)
+        self.failUnless (a._orig_surface is b._orig_surface)
+        c = games.Text (screen, 100, 200, "Hello", 20, colour.blue)
+        self.failIf (c._orig_surface is a._orig_surface)
+        b.set_colour (colour.blue)
+        self.failUnless (b._orig_surface is c._orig_surface)
+        self.failIf (b._orig_surface is a._orig_surface)
+        d = games.Text (screen, 200, 200, "Hello", 24, colour.red)
+        self.failIf (d._orig_surface is a._orig_surface)
+
+
+###############################################################################
+## Assets
+###############################################################################
+
+class AssetTest (ScreenTestCase):
+    """
+    An AssetManager reads each file once and hands out the same
+    surface after that; files it can't read give the errors
+    load_image always gave.
+    """
+
+    def setUp (self):
+        ScreenTestCase.setUp (self)
+        self.directory = tempfile.mkdtemp ()
+        self.assets = games.AssetManager ()
+
+    def tearDown (self):
+        ScreenTestCase.tearDown (self)
+        shutil.rmtree (self.directory)
+
+    def image_file (self, name, size=(10, 10)):
+        surface = pygame.Surface (size)
+        surface.fill (colour.red)
+        filename = os.path.join (self.directory, name)
+        pygame.image.save (surface, filename)
+        return filename
+
+    def test_cache (self):
+        assets = self.assets
+        filename = self.image_file ("a.bmp")
+        image = assets.image (filename)
+        self.assertEqual ((assets.hits, assets.misses), (0, 1))
+        self.failUnless (assets.image (filename) is image)
+        self.assertEqual ((assets.hits, assets.misses), (1, 1))
+        # It's kept by transparency too.
+        opaque = assets.image (filename, 0)
+        self.failIf (opaque is image)
+        self.failUnless (assets.image (filename, 0) is opaque)
+
+        # load_image gives out copies unless asked for the shared one.
+        filename = self.image_file ("b.bmp")
+        shared = games.load_image (filename, shared=1)
+        self.failUnless (games.load_image (filename, shared=1) is shared)
+        copy = games.load_image (filename)
+        self.failIf (copy is shared)
+        self.assertEqual (copy.get_size (), shared.get_size ())
+
+    def test_budget (self):
+        assets = self.assets
+        small = [self.image_file ("%d.bmp" % i) for i in xrange (3)]
+        images = [assets.image (filename) for filename in small]
+        size = assets.get_size ()
+        assets.set_budget (size)
+        self.assertEqual (len (assets._entries), 3)
+        # Using the first one again makes the second the least recently
+        # used, so that's the one to go.
+        assets.image (small [0])
+        assets.image (self.image_file ("3.bmp"))
+        self.assertEqual (len (assets._entries), 3)
+        self.failUnless (assets.image (small [0]) is images [0])
+        self.failUnless (assets.image (small [2]) is images [2])
+        self.failIf (assets.image (small [1]) is images [1])
+        self.failIf (assets.get_size () > size)
+
+    def test_preload (self):
+        assets = self.assets
+        files = [self.image_file ("%d.bmp" % i) for i in xrange (5)]
+        assets.preload (files [:4], sheets=[(files [4], 0)])
+        assets.wait ()
+        self.assertEqual (assets.progress (), 1.0)
+        self.assertEqual (len (assets._entries), 5)
+        images = [assets.image (filename) for filename in files [:4]]
+        assets.sheet (files [4], 0)
+        self.assertEqual ((assets.hits, assets.misses), (5, 0))
+        self.failUnless (assets.image (files [0]) is images [0])
+
+    def test_missing (self):
+        assets = self.assets
+        filename = os.path.join (self.directory, "missing.bmp")
+        for load in (assets.image, games.load_image):
+            try:
+                load (filename)
+            except games.GamesError, e:
+                self.assertEqual (str (e), 'Could not load image "%s" %s'
+                                  % (filename, pygame.get_error ()))
+            else:
+                self.fail ("Loaded a file that isn't there")
+
+        # A failed preload raises the same error, once, from wait.
+        assets.preload ([filename])
+        try:
+            assets.wait ()
+        except games.GamesError, e:
+            self.assertEqual (str (e), 'Could not load image "%s" %s'
+                              % (filename, pygame.get_error ()))
+        else:
+            self.fail ("Preloaded a file that isn't there")
+        assets.wait ()
+        self.assertEqual (len (assets._entries), 0)
+
+        # And once it's there, it loads.
+        self.image_file ("missing.bmp")
+        self.assertEqual (assets.image (filename).get_size (), (10, 10))
+
+
+if __name__ == "__main__":
+    unittest.main ()
+
+# vim:expandtab:sts=4:sw=4:showmatch: